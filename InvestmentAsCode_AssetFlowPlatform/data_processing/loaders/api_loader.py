@@ -1,8 +1,14 @@
 import os
+import json
+import asyncio
+import aiohttp
 import requests
 from .loader import Loader
+from .response_cache import ResponseCache
+from InvestmentAsCode_AssetFlowPlatform.data_processing.managers.http_manager import HttpSessionManager
+from InvestmentAsCode_AssetFlowPlatform.utils.common_utils import iter_json_array_items, split_into_chunks
 from dotenv import load_dotenv
-from typing import Dict, Any, List
+from typing import Dict, Any, List, AsyncIterator, Iterator, Optional, Tuple
 
 load_dotenv()
 
@@ -10,12 +16,17 @@ class ApiLoader(Loader):
     api_url: str
     __api_key: str
     parameters: Dict[str, Any]
+    session: requests.Session
+    cache: Optional[ResponseCache]
 
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.api_url = config.get("api_url")
         self.__api_key = os.getenv(config.get("api_key_name"))
         self.parameters = self._add_api_key(config.get("parameters"))
+        self.session = HttpSessionManager.get_session(self.api_url)
+        # optional on-disk response cache, eg. "cache": {"ttl_seconds": 3600}
+        self.cache = ResponseCache(config["cache"]) if config.get("cache") is not None else None
 
     def _add_api_key(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
         """add API key to the GET API parameter
@@ -29,27 +40,267 @@ class ApiLoader(Loader):
         parameters["apikey"] = self.__api_key
         return parameters
 
+    def _send_request(self, headers: Optional[Dict[str, str]] = None, stream: bool = False) -> requests.Response:
+        """Send the GET request through the shared pooled session, 429 / 5xx responses are retried with backoff
+
+        Args:
+            headers (Optional[Dict[str, str]], optional): extra request headers. Defaults to None.
+            stream (bool, optional): defer downloading the response body until it is iterated. Defaults to False.
+
+        Raises:
+            requests.exceptions.RequestException: the request still failed after retries, or got a non-retryable error status
+
+        Returns:
+            requests.Response: successful (2xx / 304) response
+        """
+        try:
+            print(f"Sending GET API Requests to {self.api_url}")
+            response = self.session.get(self.api_url,
+                                        params=self.parameters,
+                                        headers=headers,
+                                        stream=stream,
+                                        timeout=HttpSessionManager.get_timeout())
+
+            print(f"Finish GET requests, Response Status Code = {response.status_code}")
+            response.raise_for_status()
+
+        except requests.exceptions.RequestException as error:
+            print(f"Error: Unexpected response {error}")
+            raise
+
+        return response
+
     def fetch_data(self) -> List[Dict[str, Any]]:
         """ Send the API request to endpoint and get response data
 
+        When cache is configured, a fresh cached response is served without request,
+        and a stale one is revalidated with ETag / Last-Modified before being served
+
+        Raises:
+            requests.exceptions.RequestException: the request still failed after retries, or got a non-retryable error status
+
         Returns:
             List[Dict[str, Any]]: response data, in format of list of dictionaries
         """
+        if self.cache is None:
+            return self._send_request().json()
 
-        try:
-            print(f"Sending GET API Requests to {self.api_url}")
-            response = requests.get(self.api_url, self.parameters)
+        cache_key = self.cache.build_key(self.api_url, self.parameters)
+        cache_entry = self.cache.get_entry(cache_key)
 
-            print(f"Finish GET requests, Response Status Code = {response.status_code}")
-            if response.status_code != 200:
-                return f"Error: Unexpected response {response}"
+        if cache_entry is not None and self.cache.is_fresh(cache_entry):
+            body = self.cache.read_body(cache_key)
+            if body is not None:
+                print(f"Serve GET API Requests to {self.api_url} from cache")
+                return json.loads(body)
+            cache_entry = None
+
+        revalidation_headers = self.cache.get_revalidation_headers(cache_entry) if cache_entry is not None else None
+        response = self._send_request(revalidation_headers)
+
+        if response.status_code == 304 and cache_entry is not None:
+            body = self.cache.read_body(cache_key)
+            if body is not None:
+                print(f"Cached response of {self.api_url} is not modified, serve it from cache")
+                self.cache.mark_revalidated(cache_key, cache_entry)
+                return json.loads(body)
+            # a 304 response has no body, request it again unconditionally
+            response = self._send_request()
+
+        self.cache.store(cache_key, self.api_url, response.content, response.headers)
+
+        return response.json()
+
+    def fetch_data_in_batches(self, batch_size: int = 5000) -> Iterator[List[Dict[str, Any]]]:
+        """ Send the API request to endpoint and parse the JSON array response incrementally,
+        yield fixed-size batches of records so peak memory doesn't grow with the response size
+
+        When cache is configured, the cached body is streamed from disk, otherwise the body is written to cache while streaming
+
+        Args:
+            batch_size (int, optional): number of records per batch. Defaults to 5000.
+
+        Raises:
+            requests.exceptions.RequestException: the request still failed after retries, or got a non-retryable error status
+            ValueError: the response is not a JSON array
+
+        Yields:
+            Iterator[List[Dict[str, Any]]]: batches of response records
+        """
+        if self.cache is not None:
+            cache_key = self.cache.build_key(self.api_url, self.parameters)
+            cache_entry = self.cache.get_entry(cache_key)
+
+            if cache_entry is not None and self.cache.is_fresh(cache_entry):
+                cached_chunks = self.cache.iter_body_chunks(cache_key)
+                if cached_chunks is not None:
+                    print(f"Serve GET API Requests to {self.api_url} from cache")
+                    yield from split_into_chunks(iter_json_array_items(cached_chunks), batch_size)
+                    return
+                cache_entry = None
+
+            revalidation_headers = self.cache.get_revalidation_headers(cache_entry) if cache_entry is not None else None
+        else:
+            revalidation_headers = None
+
+        response = self._send_request(revalidation_headers, stream=True)
 
-            data = response.json()
+        chunks = None
+        if response.status_code == 304 and self.cache is not None and cache_entry is not None:
+            chunks = self.cache.iter_body_chunks(cache_key)
+            if chunks is not None:
+                print(f"Cached response of {self.api_url} is not modified, serve it from cache")
+                self.cache.mark_revalidated(cache_key, cache_entry)
+            else:
+                # a 304 response has no body, request it again unconditionally
+                response.close()
+                response = self._send_request(stream=True)
+
+        with response:
+            if chunks is None:
+                chunks = response.iter_content(chunk_size=64 * 1024)
+                if self.cache is not None:
+                    chunks = self.cache.store_stream(cache_key, self.api_url, chunks, response.headers)
+
+            record_count = 0
+            for batch in split_into_chunks(iter_json_array_items(chunks), batch_size):
+                record_count += len(batch)
+                yield batch
+
+        print(f"Finish streaming {record_count} records from {self.api_url}")
+
+    def iter_batches(self, batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """yield the JSON array response in batches, parsed while it is downloaded, see fetch_data_in_batches
+
+        Args:
+            batch_size (int, optional): number of records per batch. Defaults to 1000.
+
+        Yields:
+            Iterator[List[Dict[str, Any]]]: batches of response records
+        """
+        yield from self.fetch_data_in_batches(batch_size)
+
+    async def _fetch_symbol_data_async(self,
+                                       session: aiohttp.ClientSession,
+                                       semaphore: asyncio.Semaphore,
+                                       symbol: str,
+                                       extra_parameters: Optional[Dict[str, Any]] = None) -> Tuple[str, Any]:
+        """Send the API request for one symbol, waiting for a free slot in the semaphore first.
+        429 / 5xx responses and transport errors are retried with the same backoff policy as HttpSessionManager,
+        any other failure (eg. 404, invalid JSON body) is returned at once, it never fails the other symbols
+
+        Args:
+            session (aiohttp.ClientSession): shared session of the current batch
+            semaphore (asyncio.Semaphore): semaphore bounding the number of in-flight requests
+            symbol (str): symbol to be filled into the '{symbol}' placeholder of api_url
+            extra_parameters (Optional[Dict[str, Any]], optional): parameters only used for this symbol. Defaults to None.
+
+        Returns:
+            Tuple[str, Any]: symbol and its response data, or the raised exception when the request failed
+        """
+        url = self.api_url.format(symbol=symbol)
+        # aiohttp only accepts str / int / float query values
+        parameters = {
+            key: value
+            for key, value in {**self.parameters, **(extra_parameters or {})}.items()
+            if value is not None
+        }
+
+        attempt = 0
+        while True:
+            attempt += 1
+            async with semaphore:
+                try:
+                    async with session.get(url, params=parameters) as response:
+                        if response.status not in HttpSessionManager.retry_status_codes:
+                            response.raise_for_status()
+                            data = await response.json()
+                            return symbol, data
+
+                        error = aiohttp.ClientResponseError(response.request_info,
+                                                            response.history,
+                                                            status=response.status,
+                                                            message=response.reason)
+
+                except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as raised_error:
+                    # transport error, eg. connection reset or truncated body, retried
+                    error = raised_error
+                except aiohttp.ClientResponseError as raised_error:
+                    error = raised_error
+                    if error.status not in HttpSessionManager.retry_status_codes:
+                        print(f"Error: Unexpected response {error} for {symbol}")
+                        return symbol, error
+                except (aiohttp.ClientError, ValueError) as raised_error:
+                    # eg. an invalid JSON body, retrying won't fix it
+                    print(f"Error: Unexpected response {raised_error} for {symbol}")
+                    return symbol, raised_error
+
+            if attempt > HttpSessionManager.get_max_retries():
+                print(f"Error: Unexpected response {error} for {symbol}, give up after {attempt} attempts")
+                return symbol, error
+
+            # back off outside the semaphore, so other symbols can use the slot meanwhile
+            await asyncio.sleep(HttpSessionManager.compute_backoff(attempt))
+
+    async def fetch_data_for_symbols_async(self,
+                                           symbols: List[str],
+                                           concurrency_limit: int = 10,
+                                           symbol_parameters: Optional[Dict[str, Dict[str, Any]]] = None) -> AsyncIterator[Tuple[str, Any]]:
+        """Send the API requests for many symbols concurrently, yield each symbol's response data as it finishes
+
+        api_url should contain a '{symbol}' placeholder,
+        eg. "https://financialmodelingprep.com/api/v3/historical-price-full/{symbol}"
+
+        Args:
+            symbols (List[str]): symbols to be fetched
+            concurrency_limit (int, optional): max number of requests in flight. Defaults to 10.
+            symbol_parameters (Optional[Dict[str, Dict[str, Any]]], optional): extra parameters per symbol, eg. {"AAPL": {"from": "2024-04-01"}}. Defaults to None.
+
+        Yields:
+            Tuple[str, Any]: symbol and its response data (or the exception when failed), in order of completion
+        """
+        symbol_parameters = symbol_parameters or {}
+        semaphore = asyncio.Semaphore(concurrency_limit)
+        # connections are kept alive and reused by all requests of this batch
+        connector = aiohttp.TCPConnector(limit=concurrency_limit)
+        timeout = aiohttp.ClientTimeout(total=HttpSessionManager.get_timeout())
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            tasks = [
+                asyncio.ensure_future(
+                    self._fetch_symbol_data_async(session, semaphore, symbol, symbol_parameters.get(symbol))
+                )
+                for symbol in symbols
+            ]
+            for finished_task in asyncio.as_completed(tasks):
+                yield await finished_task
+
+    def fetch_data_for_symbols(self,
+                               symbols: List[str],
+                               concurrency_limit: int = 10,
+                               symbol_parameters: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Blocking wrapper of fetch_data_for_symbols_async, collect response data of all symbols
+
+        Args:
+            symbols (List[str]): symbols to be fetched
+            concurrency_limit (int, optional): max number of requests in flight. Defaults to 10.
+            symbol_parameters (Optional[Dict[str, Dict[str, Any]]], optional): extra parameters per symbol. Defaults to None.
+
+        Returns:
+            Dict[str, Any]: response data (or the exception when failed) keyed by symbol
+        """
 
-            return data
+        async def collect_results() -> Dict[str, Any]:
+            results = {}
+            async for symbol, data in self.fetch_data_for_symbols_async(symbols,
+                                                                             concurrency_limit,
+                                                                             symbol_parameters):
+                print(f"Finish GET requests for '{symbol}' ({len(results) + 1}/{len(symbols)})")
+                results[symbol] = data
+            return results
 
-        except requests.exceptions.HTTPError as error:
-            return f"Error: Unexpected response {error}"
+        print(f"Sending {len(symbols)} GET API Requests to {self.api_url}, concurrency limit = {concurrency_limit}")
+        return asyncio.run(collect_results())
 
     def load_data(self, data: Any):
         pass
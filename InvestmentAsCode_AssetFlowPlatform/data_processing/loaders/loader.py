@@ -1,4 +1,7 @@
 from abc import ABC, abstractmethod
+from typing import Any, Iterator, List
+
+from InvestmentAsCode_AssetFlowPlatform.utils.common_utils import split_into_chunks
 
 class Loader(ABC):
   """interface class for Loaders
@@ -16,3 +19,15 @@ class Loader(ABC):
   def load_data(self, data):
       # Load and transform the fetched data
       raise NotImplementedError("Subclasses must implement load_data()")
+
+  def iter_batches(self, batch_size: int = 1000) -> Iterator[List[Any]]:
+      """yield the fetched data in batches of batch_size items, see StagePipeline.
+      Subclasses able to stream should override it, so the whole data is never held in memory
+
+      Args:
+          batch_size (int, optional): number of items per batch. Defaults to 1000.
+
+      Yields:
+          Iterator[List[Any]]: batches of fetched items
+      """
+      yield from split_into_chunks(self.fetch_data(), batch_size)
@@ -1,16 +1,21 @@
 import os
 import sys
 from datetime import datetime
-from typing import Dict, Any, Callable, List, Union
-from pymongo import MongoClient
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo.collection import Collection
 
 from .loader import Loader
 from InvestmentAsCode_AssetFlowPlatform.data_processing.managers.mongo_manager import MongoDBManager
+from InvestmentAsCode_AssetFlowPlatform.data_processing.managers.mongo_timeseries_storage import MongoTimeSeriesStorage
+from InvestmentAsCode_AssetFlowPlatform.utils.common_utils import split_into_chunks
 
 from dotenv import load_dotenv
 load_dotenv()
 
 class MongoLoader(Loader):
+    # max number of collections per $unionWith aggregation, see get_collections_min_max_dates
+    union_collections_limit: int = 200
 
     def __init__(self, config: Dict[str, str]):
         super().__init__(config)
@@ -50,18 +55,97 @@ class MongoLoader(Loader):
       pass
 
 
+    def _get_timeseries_storage(self) -> Optional[MongoTimeSeriesStorage]:
+      """get the time-series storage when collection_name is a per-symbol collection stored in it
+
+      Returns:
+          Optional[MongoTimeSeriesStorage]: storage, None when collection_name is a real collection
+      """
+      timeseries_storage = self.manager.get_timeseries_storage(self.database_name)
+      if timeseries_storage is None or not timeseries_storage.is_virtual_collection(self.collection_name):
+          return None
+      return timeseries_storage
+
+    def _get_collection(self) -> Collection:
+      """get the collection physically holding the target collection's data
+
+      Returns:
+          Collection: MongoDB collection
+      """
+      timeseries_storage = self._get_timeseries_storage()
+      collection_name = timeseries_storage.collection_name if timeseries_storage is not None else self.collection_name
+      return self.client[self.database_name][collection_name]
+
+    def _find(self,
+              query: Optional[Dict[str, Any]] = None,
+              projection: Optional[Dict[str, Any]] = None,
+              batch_size: Optional[int] = None,
+              sort: Optional[List[Tuple[str, int]]] = None,
+              limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+      """build the find cursor of the target database's collection,
+      transparently scoped to the symbol when the collection is stored in a time-series collection
+
+      Args:
+          query (Optional[Dict[str, Any]], optional): filter query. Defaults to None, matching all items.
+          projection (Optional[Dict[str, Any]], optional): fields to include / exclude, eg. {'_id': 0}. Defaults to None, returning all fields.
+          batch_size (Optional[int], optional): number of items per server round trip. Defaults to None, using server default.
+          sort (Optional[List[Tuple[str, int]]], optional): sort specification, eg. [('date', ASCENDING)]. Defaults to None.
+          limit (Optional[int], optional): max number of items. Defaults to None, no limit.
+
+      Returns:
+          Iterator[Dict[str, Any]]: lazy cursor over the matching items
+      """
+      timeseries_storage = self._get_timeseries_storage()
+      collection = self._get_collection()
+
+      if timeseries_storage is not None:
+          query = timeseries_storage.to_storage_query(query, self.collection_name)
+
+      cursor = collection.find(query or {}, projection)
+      if batch_size is not None:
+          cursor = cursor.batch_size(batch_size)
+      if sort is not None:
+          cursor = cursor.sort(sort)
+      if limit is not None:
+          cursor = cursor.limit(limit)
+
+      if timeseries_storage is not None:
+          return map(timeseries_storage.from_storage_document, cursor)
+
+      return cursor
+
+    @staticmethod
+    def _build_date_filter_query(date_key: str, input_date: str, comparison_operator: str) -> Dict[str, Any]:
+      """build the filter query for larger, smaller or equal to specify date
+
+      Args:
+          date_key (str): date field string in collection
+          input_date (str): date value used as comparision
+          comparison_operator (str): >, <, = representing expected filter logic
+
+      Returns:
+          Dict[str, Any]: filter query
+      """
+      filter_query = {}
+      if comparison_operator == '=':
+          filter_query = {date_key: input_date}
+      elif comparison_operator == '>':
+          filter_query = {date_key: {'$gt': input_date}}
+      elif comparison_operator == '<':
+          filter_query = {date_key: {'$lt': input_date}}
+
+      return filter_query
+
+
     def load_data(self) -> List[Dict[str, Any]]:
       """load the data in the target database's collection
 
       Returns:
           List[Dict[str, Any]]: collection data, in a format of list of dictionaries
       """
-      db = self.client[self.database_name]
-      collection = db[self.collection_name]
-
       # Load data from MongoDB
       print("Start loading data from MongoDB")
-      data = list(collection.find())
+      data = list(self._find())
       print("Finish loading data from MongoDB")
 
       return data
@@ -77,10 +161,44 @@ class MongoLoader(Loader):
       """
       return self.load_data()
 
+    @MongoDBManager.ensure_database_exists
+    @MongoDBManager.ensure_collection_exists
+    def iter_data(self,
+                  query: Optional[Dict[str, Any]] = None,
+                  projection: Optional[Dict[str, Any]] = None,
+                  batch_size: Optional[int] = 1000,
+                  sort: Optional[List[Tuple[str, int]]] = None,
+                  limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+      """stream the data in the target database's collection, items are fetched from server batch by batch
+
+      Args:
+          query (Optional[Dict[str, Any]], optional): filter query. Defaults to None, matching all items.
+          projection (Optional[Dict[str, Any]], optional): fields to include / exclude, eg. {'_id': 0}. Defaults to None, returning all fields.
+          batch_size (Optional[int], optional): number of items per server round trip. Defaults to 1000.
+          sort (Optional[List[Tuple[str, int]]], optional): sort specification, eg. [('date', ASCENDING)]. Defaults to None.
+          limit (Optional[int], optional): max number of items. Defaults to None, no limit.
+
+      Returns:
+          Iterator[Dict[str, Any]]: lazy iterator over the collection items
+      """
+      return self._find(query, projection, batch_size, sort, limit)
+
+    def iter_batches(self, batch_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+      """yield the items of the target database's collection in batches of batch_size items, see iter_data
+
+      Args:
+          batch_size (int, optional): number of items per batch. Defaults to 1000.
+
+      Yields:
+          Iterator[List[Dict[str, Any]]]: batches of collection items
+      """
+      yield from split_into_chunks(self.iter_data(batch_size=batch_size), batch_size)
+
     @MongoDBManager.ensure_database_exists
     @MongoDBManager.ensure_collection_exists
     def get_collection_min_max_dates(self, date_key: str) -> Union[str, str]:
-      """get the min and max dates value for a date (string format) field in collection
+      """get the min and max dates value for a date (string format) field in collection,
+      computed on server side with sort + limit 1, which is an index lookup when date_key is indexed
 
       Args:
           date_key (str): string representing the field name
@@ -91,23 +209,102 @@ class MongoLoader(Loader):
       Returns:
           Union[str, str]: min and max date_key value found in collection
       """
-      db = self.client[self.database_name]
-      collection = db[self.collection_name]
-      dates = [doc[date_key] for doc in collection.find({}, {date_key: 1})]
+      query = {date_key: {'$exists': True}}
+      projection = {date_key: 1, '_id': 0}
 
-      if not dates:
+      min_document = next(iter(self._find(query, projection, sort=[(date_key, ASCENDING)], limit=1)), None)
+
+      if min_document is None:
           raise ValueError(f" Didn't find '{date_key}' in [Database: {self.database_name}], [Collection: {self.collection_name}]")
-          # return None, None
 
-      min_date = min(dates)
-      max_date = max(dates)
+      max_document = next(iter(self._find(query, projection, sort=[(date_key, DESCENDING)], limit=1)))
+
+      return min_document[date_key], max_document[date_key]
+
 
-      return min_date, max_date
+    @MongoDBManager.ensure_database_exists
+    def get_collections_min_max_dates(self, collection_names: List[str], date_key: str) -> Dict[str, Tuple[str, str]]:
+      """get the min and max dates value for a date (string format) field in many collections of the database,
+      in one server round trip per union_collections_limit collections ($unionWith of sort + limit 1 lookups per collection,
+      or one $group by symbol when the database is stored in a time-series collection)
+
+      Args:
+          collection_names (List[str]): collection names, eg. stock symbols
+          date_key (str): string representing the field name
+
+      Returns:
+          Dict[str, Tuple[str, str]]: min and max date_key value keyed by collection name,
+                                      collections missing or without date_key are left out
+      """
+      if not collection_names:
+          return {}
+
+      db = self.client[self.database_name]
+
+      timeseries_storage = self.manager.get_timeseries_storage(self.database_name)
+      if timeseries_storage is not None:
+          pipeline = [
+              {'$match': {timeseries_storage.meta_field: {'$in': collection_names}}},
+              {'$group': {
+                  '_id': f'${timeseries_storage.meta_field}',
+                  'min_date': {'$min': f'${date_key}'},
+                  'max_date': {'$max': f'${date_key}'},
+              }},
+          ]
+          min_max_dates = {
+              document['_id']: (timeseries_storage.from_storage_value(document['min_date']),
+                                timeseries_storage.from_storage_value(document['max_date']))
+              for document in db[timeseries_storage.collection_name].aggregate(pipeline)
+              if document['min_date'] is not None
+          }
+          print(f"Found date range of {len(min_max_dates)} / {len(collection_names)} collections in [Database: {self.database_name}]")
+          return min_max_dates
+
+      def build_bound_pipeline(collection_name: str, bound: str) -> List[Dict[str, Any]]:
+          return [
+              {'$match': {date_key: {'$exists': True}}},
+              {'$sort': {date_key: ASCENDING if bound == 'min' else DESCENDING}},
+              {'$limit': 1},
+              {'$project': {
+                  '_id': 0,
+                  'collection_name': {'$literal': collection_name},
+                  'bound': {'$literal': bound},
+                  'date': f'${date_key}',
+              }},
+          ]
+
+      min_max_dates = {}
+      # each collection adds 2 $unionWith stages and MongoDB rejects pipelines over 1000 stages,
+      # so the collections are looked up in groups, one aggregation per group
+      for collection_name_group in split_into_chunks(collection_names, self.union_collections_limit):
+          first_collection_name = collection_name_group[0]
+          pipeline = build_bound_pipeline(first_collection_name, 'min')
+          for collection_name in collection_name_group:
+              for bound in ('min', 'max'):
+                  if collection_name == first_collection_name and bound == 'min':
+                      continue
+                  pipeline.append({'$unionWith': {
+                      'coll': collection_name,
+                      'pipeline': build_bound_pipeline(collection_name, bound),
+                  }})
+
+          for document in db[first_collection_name].aggregate(pipeline):
+              min_date, max_date = min_max_dates.get(document['collection_name'], (None, None))
+              if document['bound'] == 'min':
+                  min_date = document['date']
+              else:
+                  max_date = document['date']
+              min_max_dates[document['collection_name']] = (min_date, max_date)
+
+      print(f"Found date range of {len(min_max_dates)} / {len(collection_names)} collections in [Database: {self.database_name}]")
+
+      return min_max_dates
 
 
     @MongoDBManager.ensure_database_exists
     def get_collection_list_from_database(self) -> List[str]:
-      """get the collection names in list of a database
+      """get the collection names in list of a database,
+      symbols stored in the time-series collection are listed as collections as well
 
       Returns:
           List[str]: list of collection names
@@ -116,6 +313,11 @@ class MongoLoader(Loader):
       db = self.client[self.database_name]
       collection_names = db.list_collection_names()
 
+      timeseries_storage = self.manager.get_timeseries_storage(self.database_name)
+      if timeseries_storage is not None and timeseries_storage.collection_name in collection_names:
+          collection_names.remove(timeseries_storage.collection_name)
+          collection_names.extend(db[timeseries_storage.collection_name].distinct(timeseries_storage.meta_field))
+
       collection_list = []
 
       # Check if there are any collections
@@ -139,10 +341,14 @@ class MongoLoader(Loader):
         Returns:
             List[Any]: list of unique value in collection's key field
         """
-        db = self.client[self.database_name]
-        collection = db[self.collection_name]
-        value_list = collection.distinct(key)
-        return value_list
+        timeseries_storage = self._get_timeseries_storage()
+        collection = self._get_collection()
+
+        if timeseries_storage is None:
+            return collection.distinct(key)
+
+        value_list = collection.distinct(key, timeseries_storage.get_scope_filter(self.collection_name))
+        return [timeseries_storage.from_storage_value(value) for value in value_list]
 
     @MongoDBManager.ensure_database_exists
     @MongoDBManager.ensure_collection_exists
@@ -156,12 +362,55 @@ class MongoLoader(Loader):
         Returns:
             List[Any]: list of dictionaries containing all the matching dictionaries
         """
-        db = self.client[self.database_name]
-        collection = db[self.collection_name]
         query = {key: value}
-        items = list(collection.find(query))
+        items = list(self._find(query))
         return items
 
+    @MongoDBManager.ensure_database_exists
+    @MongoDBManager.ensure_collection_exists
+    def find_existing_values(self, key: str, values: Iterable[Any], chunk_size: int = 10000) -> Set[Any]:
+        """ Find which of the values exist in self database-collection's key field,
+        with an '$in' query only returning the key field, which is covered by an index on key
+
+        Args:
+            key (str): item key, eg. 'symbol'
+            values (Iterable[Any]): values to be checked
+            chunk_size (int, optional): max number of values per query. Defaults to 10000.
+
+        Returns:
+            Set[Any]: values found in the collection
+        """
+        existing_values = set()
+        for values_chunk in split_into_chunks(set(values), chunk_size):
+            cursor = self._find({key: {'$in': values_chunk}}, {key: 1, '_id': 0})
+            existing_values.update(item[key] for item in cursor)
+
+        return existing_values
+
+    @MongoDBManager.ensure_database_exists
+    @MongoDBManager.ensure_collection_exists
+    def iter_items_by_key_value(self,
+                                key: str,
+                                value: Any,
+                                projection: Optional[Dict[str, Any]] = None,
+                                batch_size: Optional[int] = 1000,
+                                sort: Optional[List[Tuple[str, int]]] = None,
+                                limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """ Stream all items in self database-collection, with specific key and value
+
+        Args:
+            key (str): item key
+            value (Any): item value
+            projection (Optional[Dict[str, Any]], optional): fields to include / exclude. Defaults to None, returning all fields.
+            batch_size (Optional[int], optional): number of items per server round trip. Defaults to 1000.
+            sort (Optional[List[Tuple[str, int]]], optional): sort specification. Defaults to None.
+            limit (Optional[int], optional): max number of items. Defaults to None, no limit.
+
+        Returns:
+            Iterator[Dict[str, Any]]: lazy iterator over the matching items
+        """
+        return self._find({key: value}, projection, batch_size, sort, limit)
+
 
     @MongoDBManager.ensure_database_exists
     @MongoDBManager.ensure_collection_exists
@@ -177,19 +426,37 @@ class MongoLoader(Loader):
           List[Dict[str, Any]]: filtered list of dictionaries
       """
 
-      db = self.client[self.database_name]
-      collection = db[self.collection_name]
-
       # Define the filter query based on the comparison operator
-      filter_query = {}
-      if comparison_operator == '=':
-          filter_query = {date_key: input_date}
-      elif comparison_operator == '>':
-          filter_query = {date_key: {'$gt': input_date}}
-      elif comparison_operator == '<':
-          filter_query = {date_key: {'$lt': input_date}}
+      filter_query = self._build_date_filter_query(date_key, input_date, comparison_operator)
 
       # Filter documents by date
-      filtered_documents = collection.find(filter_query)
+      return list(self._find(filter_query))
+
+
+    @MongoDBManager.ensure_database_exists
+    @MongoDBManager.ensure_collection_exists
+    def iter_collection_by_date(self,
+                                date_key: str,
+                                input_date: str,
+                                comparison_operator: str,
+                                projection: Optional[Dict[str, Any]] = None,
+                                batch_size: Optional[int] = 1000,
+                                sort: Optional[List[Tuple[str, int]]] = None,
+                                limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+      """stream the collection items larger, smaller or equal to specify date
+
+      Args:
+          date_key (str): date field string in colelction
+          input_date (str): date value used as comparision
+          comparison_operator (str): >, <, = representing expected filter logic
+          projection (Optional[Dict[str, Any]], optional): fields to include / exclude. Defaults to None, returning all fields.
+          batch_size (Optional[int], optional): number of items per server round trip. Defaults to 1000.
+          sort (Optional[List[Tuple[str, int]]], optional): sort specification. Defaults to None.
+          limit (Optional[int], optional): max number of items. Defaults to None, no limit.
+
+      Returns:
+          Iterator[Dict[str, Any]]: lazy iterator over the filtered items
+      """
+      filter_query = self._build_date_filter_query(date_key, input_date, comparison_operator)
 
-      return list(collection.find(filter_query))
+      return self._find(filter_query, projection, batch_size, sort, limit)
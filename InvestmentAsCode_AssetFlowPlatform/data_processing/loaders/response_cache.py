@@ -0,0 +1,269 @@
+import os
+import json
+import time
+import hashlib
+import tempfile
+from dotenv import load_dotenv
+from typing import Dict, Any, BinaryIO, Optional, Mapping, Iterable, Iterator
+
+load_dotenv()
+
+
+class ResponseCache:
+    """ ResponseCache class responsible for
+        - storing API response bodies on disk, keyed by url + parameters (API key excluded)
+        - serving fresh entries within TTL, revalidating stale entries with ETag / Last-Modified
+        - evicting least recently used entries when the cache grows over max size
+    """
+    excluded_parameters = ("apikey",)
+
+    def __init__(self, config: Dict[str, Any]):
+        self.cache_dir = config.get("cache_dir") or os.getenv(
+            "API_CACHE_DIR", os.path.join(tempfile.gettempdir(), "asset_flow_api_cache")
+        )
+        self.ttl_seconds = float(config.get("ttl_seconds", os.getenv("API_CACHE_TTL_SECONDS", "3600")))
+        self.max_size_bytes = int(config.get("max_size_bytes", os.getenv("API_CACHE_MAX_SIZE_BYTES", str(512 * 1024 * 1024))))
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @classmethod
+    def build_key(cls, url: str, parameters: Mapping[str, Any]) -> str:
+        """build the cache key from url and parameters, API key is removed so it never reaches the disk
+
+        Args:
+            url (str): request url
+            parameters (Mapping[str, Any]): request parameters
+
+        Returns:
+            str: cache key
+        """
+        cache_parameters = sorted(
+            (key, str(value)) for key, value in parameters.items()
+            if key not in cls.excluded_parameters and value is not None
+        )
+        raw_key = json.dumps([url, cache_parameters])
+        return hashlib.sha256(raw_key.encode("utf-8")).hexdigest()
+
+    def _get_metadata_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get_body_path(self, key: str) -> str:
+        """get the path of the cached response body
+
+        Args:
+            key (str): cache key
+
+        Returns:
+            str: file path of the response body
+        """
+        return os.path.join(self.cache_dir, f"{key}.body")
+
+    def _write_file(self, path: str, content: bytes) -> None:
+        # write into a temp file then rename, readers never see a half written file
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.cache_dir)
+        with os.fdopen(file_descriptor, "wb") as temp_file:
+            temp_file.write(content)
+        os.replace(temp_path, path)
+
+    def _write_metadata(self, key: str, metadata: Dict[str, Any]) -> None:
+        self._write_file(self._get_metadata_path(key), json.dumps(metadata).encode("utf-8"))
+
+    def get_entry(self, key: str) -> Optional[Dict[str, Any]]:
+        """get the metadata of a cached response
+
+        Args:
+            key (str): cache key
+
+        Returns:
+            Optional[Dict[str, Any]]: metadata of the entry, None if not cached
+        """
+        try:
+            with open(self._get_metadata_path(key), "r") as metadata_file:
+                metadata = json.load(metadata_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        if not os.path.exists(self.get_body_path(key)):
+            return None
+
+        return metadata
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        """check if a cached entry is still within TTL
+
+        Args:
+            entry (Dict[str, Any]): metadata of the entry
+
+        Returns:
+            bool: True if the entry can be served without revalidation
+        """
+        return time.time() - entry["stored_at"] < self.ttl_seconds
+
+    @staticmethod
+    def get_revalidation_headers(entry: Dict[str, Any]) -> Dict[str, str]:
+        """get the conditional request headers of a stale entry
+
+        Args:
+            entry (Dict[str, Any]): metadata of the entry
+
+        Returns:
+            Dict[str, str]: If-None-Match / If-Modified-Since headers
+        """
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def _open_body(self, key: str) -> Optional[BinaryIO]:
+        # the entry may have been evicted by another process since get_entry
+        body_path = self.get_body_path(key)
+        try:
+            os.utime(body_path)
+            return open(body_path, "rb")
+        except FileNotFoundError:
+            print(f"Cached response {key} was evicted, treat it as a cache miss")
+            return None
+
+    def read_body(self, key: str) -> Optional[bytes]:
+        """read the cached response body and mark the entry as recently used
+
+        Args:
+            key (str): cache key
+
+        Returns:
+            Optional[bytes]: response body, None if the entry was evicted meanwhile
+        """
+        body_file = self._open_body(key)
+        if body_file is None:
+            return None
+
+        with body_file:
+            return body_file.read()
+
+    def iter_body_chunks(self, key: str, chunk_size: int = 64 * 1024) -> Optional[Iterator[bytes]]:
+        """read the cached response body chunk by chunk and mark the entry as recently used.
+        The file is opened right away, so an evicted entry is found before anything is served
+
+        Args:
+            key (str): cache key
+            chunk_size (int, optional): bytes per chunk. Defaults to 64 KB.
+
+        Returns:
+            Optional[Iterator[bytes]]: response body chunks, None if the entry was evicted meanwhile
+        """
+        body_file = self._open_body(key)
+        if body_file is None:
+            return None
+
+        def iter_chunks() -> Iterator[bytes]:
+            with body_file:
+                while True:
+                    chunk = body_file.read(chunk_size)
+                    if not chunk:
+                        return
+                    yield chunk
+
+        return iter_chunks()
+
+    def mark_revalidated(self, key: str, entry: Dict[str, Any]) -> None:
+        """restart the TTL of an entry after the server answered 304 Not Modified
+
+        Args:
+            key (str): cache key
+            entry (Dict[str, Any]): metadata of the entry
+        """
+        entry["stored_at"] = time.time()
+        self._write_metadata(key, entry)
+
+    def store(self, key: str, url: str, body: bytes, headers: Mapping[str, str]) -> None:
+        """store a response body with its validators, then evict old entries if over max size
+
+        Args:
+            key (str): cache key
+            url (str): request url, kept for inspection only
+            body (bytes): response body
+            headers (Mapping[str, str]): response headers
+        """
+        if len(body) > self.max_size_bytes:
+            print(f"Skip caching response of {url}, {len(body)} bytes is larger than cache max size")
+            return
+
+        self._write_file(self.get_body_path(key), body)
+        self._write_metadata(key, {
+            "url": url,
+            "stored_at": time.time(),
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+            "size": len(body),
+        })
+        self.evict()
+
+    def store_stream(self, key: str, url: str, chunks: Iterable[bytes], headers: Mapping[str, str]) -> Iterator[bytes]:
+        """pass the response body chunks through while writing them to the cache,
+        the entry is only stored once the whole body has been consumed
+
+        Args:
+            key (str): cache key
+            url (str): request url, kept for inspection only
+            chunks (Iterable[bytes]): response body chunks
+            headers (Mapping[str, str]): response headers
+
+        Yields:
+            Iterator[bytes]: the same response body chunks
+        """
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.cache_dir)
+        size = 0
+        is_cacheable = True
+
+        try:
+            with os.fdopen(file_descriptor, "wb") as temp_file:
+                for chunk in chunks:
+                    size += len(chunk)
+                    if is_cacheable and size > self.max_size_bytes:
+                        print(f"Skip caching response of {url}, it is larger than cache max size")
+                        is_cacheable = False
+                    if is_cacheable:
+                        temp_file.write(chunk)
+                    yield chunk
+
+            if is_cacheable:
+                os.replace(temp_path, self.get_body_path(key))
+                self._write_metadata(key, {
+                    "url": url,
+                    "stored_at": time.time(),
+                    "etag": headers.get("ETag"),
+                    "last_modified": headers.get("Last-Modified"),
+                    "size": size,
+                })
+                self.evict()
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def evict(self) -> None:
+        """remove least recently used entries until the cache is within max size
+        """
+        entries = []
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith(".body"):
+                continue
+            body_path = os.path.join(self.cache_dir, file_name)
+            try:
+                file_stat = os.stat(body_path)
+            except FileNotFoundError:
+                continue
+            entries.append((file_stat.st_mtime, file_stat.st_size, file_name[: -len(".body")]))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, key in sorted(entries):
+            if total_size <= self.max_size_bytes:
+                break
+            for path in (self.get_body_path(key), self._get_metadata_path(key)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            total_size -= size
+            print(f"Evicted cached response {key}")
@@ -0,0 +1,125 @@
+import os
+import random
+import threading
+from urllib.parse import urlsplit
+from dotenv import load_dotenv
+from typing import Dict, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+load_dotenv()
+
+
+class HttpSessionManager:
+    """ HttpSessionManager class responsible for
+        - handing out one pooled, keep-alive requests.Session per API base URL and process
+        - retrying 429 / 5xx responses with bounded, jittered exponential backoff
+    """
+    _sessions: Dict[Tuple[int, str], requests.Session] = {}
+    _lock: threading.Lock = threading.Lock()
+    _pool_size: int = int(os.getenv("HTTP_POOL_SIZE", "10"))
+    _max_retries: int = int(os.getenv("HTTP_MAX_RETRIES", "5"))
+    _backoff_factor: float = float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5"))
+    _backoff_jitter: float = float(os.getenv("HTTP_BACKOFF_JITTER", "0.5"))
+    _backoff_max: float = float(os.getenv("HTTP_BACKOFF_MAX", "30"))
+    _timeout: float = float(os.getenv("HTTP_TIMEOUT", "30"))
+
+    retry_status_codes: Tuple[int, ...] = (429, 500, 502, 503, 504)
+
+    @staticmethod
+    def get_base_url(url: str) -> str:
+        """get the scheme and host part of an url, used as session key
+
+        Args:
+            url (str): full request url
+
+        Returns:
+            str: base url, eg. "https://financialmodelingprep.com"
+        """
+        split_url = urlsplit(url)
+        return f"{split_url.scheme}://{split_url.netloc}"
+
+    @classmethod
+    def create_session(cls) -> requests.Session:
+        """create a requests.Session with connection pool and retry policy mounted
+
+        Returns:
+            requests.Session: new session
+        """
+        retry = Retry(
+            total=cls._max_retries,
+            backoff_factor=cls._backoff_factor,
+            backoff_jitter=cls._backoff_jitter,
+            backoff_max=cls._backoff_max,
+            status_forcelist=cls.retry_status_codes,
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=cls._pool_size, max_retries=retry)
+
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    @classmethod
+    def get_session(cls, url: str) -> requests.Session:
+        """get the shared session for the url's base url, create it on first use in this process
+
+        Args:
+            url (str): full request url
+
+        Returns:
+            requests.Session: shared session
+        """
+        # sessions are keyed by pid as well, so a forked worker never reuses its parent's sockets
+        session_key = (os.getpid(), cls.get_base_url(url))
+
+        with cls._lock:
+            if session_key not in cls._sessions:
+                print(f"Create pooled HTTP session for {session_key[1]}")
+                cls._sessions[session_key] = cls.create_session()
+
+            return cls._sessions[session_key]
+
+    @classmethod
+    def get_timeout(cls) -> float:
+        """get the request timeout in seconds
+
+        Returns:
+            float: timeout in seconds
+        """
+        return cls._timeout
+
+    @classmethod
+    def get_max_retries(cls) -> int:
+        """get the max number of retries for a request
+
+        Returns:
+            int: max retries
+        """
+        return cls._max_retries
+
+    @classmethod
+    def compute_backoff(cls, attempt: int) -> float:
+        """compute the jittered exponential backoff before the next retry, same policy as the mounted Retry
+
+        Args:
+            attempt (int): number of attempts already made, starting from 1
+
+        Returns:
+            float: seconds to sleep
+        """
+        backoff = cls._backoff_factor * (2 ** (attempt - 1)) + random.uniform(0, cls._backoff_jitter)
+        return min(backoff, cls._backoff_max)
+
+    @classmethod
+    def close_all_sessions(cls) -> None:
+        """close every session created by this process
+        """
+        with cls._lock:
+            for (pid, base_url), session in list(cls._sessions.items()):
+                if pid == os.getpid():
+                    session.close()
+                    del cls._sessions[(pid, base_url)]
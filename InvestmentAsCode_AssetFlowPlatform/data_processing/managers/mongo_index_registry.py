@@ -0,0 +1,57 @@
+from typing import Dict, List
+from pymongo import ASCENDING, IndexModel
+
+
+def _price_indexes(symbol_key: str) -> List[IndexModel]:
+    return [
+        IndexModel([(symbol_key, ASCENDING), ("date", ASCENDING)], unique=True, name=f"{symbol_key}_date_unique"),
+        # per-symbol collections are sorted / range-filtered on date alone, which can't use the compound index
+        IndexModel([("date", ASCENDING)], name="date"),
+    ]
+
+
+def _timeseries_price_indexes(symbol_key: str) -> List[IndexModel]:
+    # time-series collections don't support unique indexes, (symbol, date) uniqueness is kept by MongoSaver.upsert_data
+    return [IndexModel([(symbol_key, ASCENDING), ("date", ASCENDING)], name=f"{symbol_key}_date")]
+
+
+def _list_indexes() -> List[IndexModel]:
+    return [IndexModel([("symbol", ASCENDING)], name="symbol")]
+
+
+# indexes of each database's collections, "*" applies to every collection of the database (eg. one collection per symbol)
+MONGO_INDEX_REGISTRY: Dict[str, Dict[str, List[IndexModel]]] = {
+    "ingestion-stock_price": {
+        "*": _price_indexes("stock_symbol"),
+        # single time-series collection, see mongo_timeseries_storage
+        "price_history": _timeseries_price_indexes("stock_symbol"),
+    },
+    "ingestion-crypto_price": {
+        "*": _price_indexes("crypto_symbol"),
+        "price_history": _timeseries_price_indexes("crypto_symbol"),
+    },
+    "ingestion-general_info": {
+        "stock_list": _list_indexes(),
+        "crypto_list": _list_indexes(),
+        "exchange_traded_fund_list": _list_indexes(),
+        "company_general_info": _list_indexes(),
+        # symbols processed by the price pipelines, see jobs/asset_pipeline/symbol_universe.py
+        "pipeline_universe": [
+            IndexModel([("asset_type", ASCENDING), ("symbol", ASCENDING)], unique=True, name="asset_type_symbol_unique"),
+        ],
+    },
+}
+
+
+def get_index_models(database_name: str, collection_name: str) -> List[IndexModel]:
+    """get the registered indexes of a collection
+
+    Args:
+        database_name (str): database name string
+        collection_name (str): collection name string
+
+    Returns:
+        List[IndexModel]: indexes to be created, empty if nothing is registered
+    """
+    database_indexes = MONGO_INDEX_REGISTRY.get(database_name, {})
+    return database_indexes.get(collection_name, database_indexes.get("*", []))
@@ -1,32 +1,58 @@
 import os
+import time
+import threading
 from dotenv import load_dotenv
-from typing import Dict, Any, Callable
+from typing import Dict, Any, Callable, List, Optional, Set, Tuple
 from pymongo import MongoClient
-from pymongo.errors import ConnectionFailure
+from pymongo.errors import ConnectionFailure, OperationFailure
 from pymongo.pool import Pool
 from pymongo.mongo_client import MongoClient
 
+from InvestmentAsCode_AssetFlowPlatform.data_processing.managers.mongo_index_registry import get_index_models
+from InvestmentAsCode_AssetFlowPlatform.data_processing.managers.mongo_timeseries_storage import MongoTimeSeriesStorage
+
 load_dotenv()
 
 
 class MongoDBManager:
     """ MongoDBManager class responsible for
         - handling MongoDB connection, connect and release
-        - provide checking for database and collection exists
+        - provide checking for database and collection exists, with database / collection names cached for a short TTL
+        - apply the indexes declared in mongo_index_registry
+        - resolve per-symbol collections onto the time-series collection when MONGO_PRICE_STORAGE_MODE=timeseries
+
+    One MongoClient is shared by every loader and saver of the process,
+    it is created lazily on first use and recreated in a forked child process
     """
-    _pool: Pool = None
+    _pool: MongoClient = None
+    _pool_pid: int = None
+    _pool_lock: threading.Lock = threading.Lock()
     _mongo_server_url: str = str(os.getenv("MONGO_SERVER_URL"))
     _max_pool_size: int = int(os.getenv("MAX_POOL_SIZE"))
 
+    _metadata_cache_ttl: float = float(os.getenv("MONGO_METADATA_CACHE_TTL", "60"))
+    _metadata_cache_lock: threading.Lock = threading.Lock()
+    _database_names_cache: Tuple[float, List[str]] = None
+    _collection_names_cache: Dict[str, Tuple[float, List[str]]] = {}
+
+    _indexed_collections: Set[Tuple[str, str]] = set()
+
     @classmethod
     def initialize_pool(cls):
-        """initialize the MongoClient with definied pool size
+        """initialize the MongoClient with definied pool size, only once per process
         """
-        cls._pool = MongoClient(cls._mongo_server_url, maxPoolSize=cls._max_pool_size)
+        with cls._pool_lock:
+            if cls._pool is not None and cls._pool_pid == os.getpid():
+                return
+
+            # a client inherited through fork must not be used, create a new one for this process
+            print(f"Create MongoClient for process {os.getpid()}")
+            cls._pool = MongoClient(cls._mongo_server_url, maxPoolSize=cls._max_pool_size, connect=False)
+            cls._pool_pid = os.getpid()
 
     @classmethod
     def acquire_connection(cls):
-        if not cls._pool:
+        if not cls._pool or cls._pool_pid != os.getpid():
             raise ConnectionFailure("The MongoDB connection pool is not initialized.")
 
         return cls._pool
@@ -38,11 +64,104 @@ class MongoDBManager:
 
     @classmethod
     def release_connection(cls, connection):
-        if connection:
+        # the shared client stays open for the other loaders / savers, use close_pool() on shutdown
+        if connection and connection is not cls._pool:
             connection.close()
 
+    @classmethod
+    def close_pool(cls):
+        """close the shared MongoClient of this process
+        """
+        with cls._pool_lock:
+            if cls._pool is not None and cls._pool_pid == os.getpid():
+                cls._pool.close()
+            cls._pool = None
+            cls._pool_pid = None
+
+    @classmethod
+    def _reset_after_fork(cls):
+        # the lock may have been held by another thread at fork time, and the parent's client is unusable
+        cls._pool_lock = threading.Lock()
+        cls._pool = None
+        cls._pool_pid = None
+        cls._metadata_cache_lock = threading.Lock()
+        cls._database_names_cache = None
+        cls._collection_names_cache = {}
+        cls._indexed_collections = set()
+
+    @classmethod
+    def get_database_names(cls, client: MongoClient) -> List[str]:
+        """get the database names, served from cache within MONGO_METADATA_CACHE_TTL seconds
+
+        Args:
+            client (MongoClient): MongoDB client
+
+        Returns:
+            List[str]: database names
+        """
+        with cls._metadata_cache_lock:
+            cached = cls._database_names_cache
+            if cached is not None and time.monotonic() - cached[0] < cls._metadata_cache_ttl:
+                return cached[1]
+
+        database_names = client.list_database_names()
+
+        with cls._metadata_cache_lock:
+            cls._database_names_cache = (time.monotonic(), database_names)
+
+        return database_names
+
+    @classmethod
+    def get_collection_names(cls, client: MongoClient, database_name: str) -> List[str]:
+        """get the collection names of a database, served from cache within MONGO_METADATA_CACHE_TTL seconds
+
+        Args:
+            client (MongoClient): MongoDB client
+            database_name (str): database name string
+
+        Returns:
+            List[str]: collection names
+        """
+        with cls._metadata_cache_lock:
+            cached = cls._collection_names_cache.get(database_name)
+            if cached is not None and time.monotonic() - cached[0] < cls._metadata_cache_ttl:
+                return cached[1]
+
+        collection_names = client[database_name].list_collection_names()
+
+        with cls._metadata_cache_lock:
+            cls._collection_names_cache[database_name] = (time.monotonic(), collection_names)
+
+        return collection_names
+
+    @classmethod
+    def invalidate_metadata_cache(cls, database_name: str = None) -> None:
+        """drop the cached database / collection names, called after collections are created or dropped
+
+        Args:
+            database_name (str, optional): only drop the collection names of this database. Defaults to None, dropping everything.
+        """
+        with cls._metadata_cache_lock:
+            cls._database_names_cache = None
+            if database_name is None:
+                cls._collection_names_cache = {}
+            else:
+                cls._collection_names_cache.pop(database_name, None)
+
     @staticmethod
-    def check_database_exists(client: MongoClient, database_name: str) -> bool:
+    def get_timeseries_storage(database_name: str) -> Optional[MongoTimeSeriesStorage]:
+        """get the time-series storage of a database, see MongoTimeSeriesStorage
+
+        Args:
+            database_name (str): database name string
+
+        Returns:
+            Optional[MongoTimeSeriesStorage]: storage, None when the database keeps one collection per symbol
+        """
+        return MongoTimeSeriesStorage.get(database_name)
+
+    @classmethod
+    def check_database_exists(cls, client: MongoClient, database_name: str) -> bool:
         """static method to check if database exists
 
         Args:
@@ -53,7 +172,7 @@ class MongoDBManager:
             bool: True or False representing database existence
         """
         try:
-            if database_name in client.list_database_names():
+            if database_name in cls.get_database_names(client):
                 print(f"The database '{database_name}' exists.")
                 return True
             else:
@@ -63,9 +182,9 @@ class MongoDBManager:
             print(f"An error occurred while checking database existence: {str(e)}")
             return False
 
-    @staticmethod
-    def check_collection_exists(client: MongoClient, database_name: str, collection_name: str) -> bool:
-        """_summary_
+    @classmethod
+    def check_collection_exists(cls, client: MongoClient, database_name: str, collection_name: str) -> bool:
+        """check if collection exists in database
 
         Args:
             client (MongoClient): MongoDB client
@@ -76,9 +195,16 @@ class MongoDBManager:
             bool: True or False representing collection existence
         """
         try:
-            database = client[database_name]
-            collection_names = database.list_collection_names()
-            if collection_name in collection_names:
+            timeseries_storage = cls.get_timeseries_storage(database_name)
+            if timeseries_storage is not None and timeseries_storage.is_virtual_collection(collection_name):
+                # a per-symbol collection exists when the symbol has data in the time-series collection
+                is_collection_exist = client[database_name][timeseries_storage.collection_name].find_one(
+                    timeseries_storage.get_scope_filter(collection_name), {"_id": 1}
+                ) is not None
+            else:
+                is_collection_exist = collection_name in cls.get_collection_names(client, database_name)
+
+            if is_collection_exist:
                 print(
                     f"The collection '{collection_name}' exists in the '{database_name}' database."
                 )
@@ -124,8 +250,8 @@ class MongoDBManager:
 
         return wrapper
 
-    @staticmethod
-    def remove_collection(client: MongoClient, database_name: str, collection_name: str) -> None:
+    @classmethod
+    def remove_collection(cls, client: MongoClient, database_name: str, collection_name: str) -> None:
         """function to remove the entire collection in specify database
 
         Args:
@@ -134,10 +260,101 @@ class MongoDBManager:
             collection_name (str): collection name string to be dropped
         """
         db = client[database_name]
+
+        timeseries_storage = cls.get_timeseries_storage(database_name)
+        if timeseries_storage is not None and timeseries_storage.is_virtual_collection(collection_name):
+            # only remove the symbol's data from the time-series collection
+            db[timeseries_storage.collection_name].delete_many(timeseries_storage.get_scope_filter(collection_name))
+            print(
+                f"The collection '{collection_name}' has been removed from the '{database_name}' database."
+            )
+            return
+
         collection = db[collection_name]
 
         # Remove the collection
         collection.drop()
+        cls.invalidate_metadata_cache(database_name)
+        cls._indexed_collections.discard((database_name, collection_name))
         print(
             f"The collection '{collection_name}' has been removed from the '{database_name}' database."
         )
+
+    @classmethod
+    def ensure_indexes(cls,
+                       client: MongoClient,
+                       database_name: str,
+                       collection_name: str,
+                       index_collection_name: str = None) -> None:
+        """create the indexes registered for the collection, only once per collection and process.
+        create_indexes is idempotent, existing indexes with the same definition are kept.
+        A failed creation is logged as a warning and not retried in the process
+
+        Args:
+            client (MongoClient): MongoDB client
+            database_name (str): database name string
+            collection_name (str): collection name string
+            index_collection_name (str, optional): look up the registered indexes of this collection instead,
+                                                   eg. the target of a staging collection. Defaults to None.
+        """
+        timeseries_storage = cls.get_timeseries_storage(database_name)
+        if timeseries_storage is not None and timeseries_storage.is_virtual_collection(collection_name):
+            collection_name = timeseries_storage.collection_name
+            index_collection_name = None
+
+        if (database_name, collection_name) in cls._indexed_collections:
+            return
+
+        if timeseries_storage is not None and not timeseries_storage.is_virtual_collection(collection_name):
+            timeseries_storage.ensure_collection(client)
+
+        index_models = get_index_models(database_name, index_collection_name or collection_name)
+        if index_models:
+            try:
+                index_names = client[database_name][collection_name].create_indexes(index_models)
+                print(f"Ensured indexes {index_names} on [Database: {database_name}], [Collection: {collection_name}]")
+            except OperationFailure as e:
+                # eg. existing duplicated rows block a unique index, keep ingesting and let it be fixed manually,
+                # the collection is still recorded below, so the failing creation isn't retried on every save
+                unique_index_names = [index_model.document["name"] for index_model in index_models if index_model.document.get("unique")]
+                print(f"Warning: failed to create indexes on '{database_name}.{collection_name}': {str(e)}. "
+                      f"Unique indexes {unique_index_names} are NOT enforced, upserts may duplicate documents "
+                      f"until the collection is fixed and the indexes are created")
+            else:
+                cls.invalidate_metadata_cache(database_name)
+
+        cls._indexed_collections.add((database_name, collection_name))
+
+    @classmethod
+    def rename_collection(cls,
+                          client: MongoClient,
+                          database_name: str,
+                          source_collection_name: str,
+                          target_collection_name: str) -> None:
+        """atomically rename a collection over the target collection, the target is dropped in the same operation
+
+        Args:
+            client (MongoClient): MongoDB client
+            database_name (str): database name string
+            source_collection_name (str): collection name to be renamed, eg. a staging collection
+            target_collection_name (str): collection name to be replaced
+        """
+        client.admin.command(
+            "renameCollection",
+            f"{database_name}.{source_collection_name}",
+            to=f"{database_name}.{target_collection_name}",
+            dropTarget=True,
+        )
+        cls.invalidate_metadata_cache(database_name)
+
+        # indexes move with the renamed collection
+        if (database_name, source_collection_name) in cls._indexed_collections:
+            cls._indexed_collections.discard((database_name, source_collection_name))
+            cls._indexed_collections.add((database_name, target_collection_name))
+
+        print(
+            f"The collection '{source_collection_name}' has replaced '{target_collection_name}' in the '{database_name}' database."
+        )
+
+
+os.register_at_fork(after_in_child=MongoDBManager._reset_after_fork)
@@ -0,0 +1,173 @@
+import os
+from datetime import datetime
+from dotenv import load_dotenv
+from typing import Dict, Any, Optional
+from pymongo import MongoClient
+from pymongo.errors import CollectionInvalid
+
+load_dotenv()
+
+
+# price databases that can be stored in one native time-series collection instead of one collection per symbol
+MONGO_TIMESERIES_REGISTRY: Dict[str, Dict[str, str]] = {
+    "ingestion-stock_price": {
+        "collection_name": "price_history",
+        "time_field": "date",
+        "meta_field": "stock_symbol",
+        "granularity": "hours",
+    },
+    "ingestion-crypto_price": {
+        "collection_name": "price_history",
+        "time_field": "date",
+        "meta_field": "crypto_symbol",
+        "granularity": "hours",
+    },
+}
+
+
+class MongoTimeSeriesStorage:
+    """ MongoTimeSeriesStorage class responsible for
+        - mapping the per-symbol (virtual) collections of a price database onto one native time-series collection,
+          with the symbol as metaField and 'date' as timeField
+        - converting the 'YYYY-MM-DD' time field into BSON dates on write / query, and back into strings on read
+
+    Enabled by setting MONGO_PRICE_STORAGE_MODE=timeseries
+    """
+    date_format: str = "%Y-%m-%d"
+
+    def __init__(self, database_name: str, config: Dict[str, str]):
+        self.database_name = database_name
+        self.collection_name = config["collection_name"]
+        self.time_field = config["time_field"]
+        self.meta_field = config["meta_field"]
+        self.granularity = config["granularity"]
+
+    @staticmethod
+    def is_enabled() -> bool:
+        """check if price databases should be stored in time-series collections
+
+        Returns:
+            bool: True if MONGO_PRICE_STORAGE_MODE is 'timeseries'
+        """
+        return os.getenv("MONGO_PRICE_STORAGE_MODE", "collection_per_symbol") == "timeseries"
+
+    @classmethod
+    def get(cls, database_name: str) -> Optional["MongoTimeSeriesStorage"]:
+        """get the time-series storage of a database
+
+        Args:
+            database_name (str): database name string
+
+        Returns:
+            Optional[MongoTimeSeriesStorage]: storage, None if disabled or the database is not registered
+        """
+        config = MONGO_TIMESERIES_REGISTRY.get(database_name)
+        if config is None or not cls.is_enabled():
+            return None
+
+        return cls(database_name, config)
+
+    def is_virtual_collection(self, collection_name: str) -> bool:
+        """check if the collection name refers to one symbol's data inside the time-series collection
+
+        Args:
+            collection_name (str): collection name string, eg. 'AAPL'
+
+        Returns:
+            bool: True for a per-symbol collection name
+        """
+        return collection_name != self.collection_name
+
+    def get_scope_filter(self, collection_name: str) -> Dict[str, Any]:
+        """get the filter selecting the data of a (virtual) collection
+
+        Args:
+            collection_name (str): collection name string, eg. 'AAPL'
+
+        Returns:
+            Dict[str, Any]: metaField filter, empty for the time-series collection itself
+        """
+        if not self.is_virtual_collection(collection_name):
+            return {}
+
+        return {self.meta_field: collection_name}
+
+    def to_storage_value(self, value: Any) -> Any:
+        """convert string dates (also inside query operators / lists) into BSON dates"""
+        if isinstance(value, str):
+            return datetime.strptime(value, self.date_format)
+        if isinstance(value, list):
+            return [self.to_storage_value(item) for item in value]
+        if isinstance(value, dict):
+            return {operator: self.to_storage_value(operand) for operator, operand in value.items()}
+        return value
+
+    def to_storage_query(self, query: Optional[Dict[str, Any]], collection_name: str) -> Dict[str, Any]:
+        """convert a query on a (virtual) collection into a query on the time-series collection
+
+        Args:
+            query (Optional[Dict[str, Any]]): filter query, with string dates
+            collection_name (str): collection name string, eg. 'AAPL'
+
+        Returns:
+            Dict[str, Any]: filter query scoped to the symbol, with BSON dates
+        """
+        storage_query = dict(query or {})
+        if self.time_field in storage_query:
+            storage_query[self.time_field] = self.to_storage_value(storage_query[self.time_field])
+
+        storage_query.update(self.get_scope_filter(collection_name))
+        return storage_query
+
+    def to_storage_document(self, document: Dict[str, Any], collection_name: str) -> Dict[str, Any]:
+        """convert a document of a (virtual) collection into a time-series document
+
+        Args:
+            document (Dict[str, Any]): document with string date
+            collection_name (str): collection name string, eg. 'AAPL'
+
+        Returns:
+            Dict[str, Any]: document with BSON date and the symbol as metaField
+        """
+        storage_document = {key: value for key, value in document.items() if key != "_id"}
+        storage_document[self.time_field] = self.to_storage_value(storage_document[self.time_field])
+        storage_document.update(self.get_scope_filter(collection_name))
+        return storage_document
+
+    def from_storage_document(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        """convert a time-series document back into the per-symbol document format
+
+        Args:
+            document (Dict[str, Any]): document with BSON date
+
+        Returns:
+            Dict[str, Any]: document with string date
+        """
+        if isinstance(document.get(self.time_field), datetime):
+            document[self.time_field] = document[self.time_field].strftime(self.date_format)
+        return document
+
+    def from_storage_value(self, value: Any) -> Any:
+        """convert a BSON date back into a string date"""
+        if isinstance(value, datetime):
+            return value.strftime(self.date_format)
+        return value
+
+    def ensure_collection(self, client: MongoClient) -> None:
+        """create the time-series collection if it doesn't exist yet
+
+        Args:
+            client (MongoClient): MongoDB client
+        """
+        try:
+            client[self.database_name].create_collection(
+                self.collection_name,
+                timeseries={
+                    "timeField": self.time_field,
+                    "metaField": self.meta_field,
+                    "granularity": self.granularity,
+                },
+            )
+            print(f"Created time-series collection '{self.collection_name}' in the '{self.database_name}' database.")
+        except CollectionInvalid:
+            pass
@@ -1,39 +1,392 @@
+import io
 import os
+import csv
+import threading
 from dotenv import load_dotenv
-from typing import Dict, Any, Callable
+from typing import Dict, Any, Callable, Iterable, Optional, Sequence, Set
 import psycopg2
+from psycopg2 import sql
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
+
+from InvestmentAsCode_AssetFlowPlatform.data_processing.managers.postgres_partition_registry import (
+    POSTGRES_PARTITION_REGISTRY,
+    get_partition_bounds,
+)
+from InvestmentAsCode_AssetFlowPlatform.utils.common_utils import split_into_chunks
 
 load_dotenv()
 
 
 class PostgresManager():
+    """ PostgresManager class responsible for
+        - handling PostgreSQL connections, checked out from / returned to a per-process connection pool
+        - bulk loading and upserting rows
+        - creating the yearly partitions declared in postgres_partition_registry
+
+    Use it as a context manager, the connection goes back to the pool on exit,
+    with its uncommitted changes rolled back:
+
+        with PostgresManager() as postgre_manager:
+            postgre_manager.cursor.execute(...)
+            postgre_manager.commit()
+    """
+    _pool: ThreadedConnectionPool = None
+    _pool_pid: int = None
+    _pool_lock: threading.Lock = threading.Lock()
+    _min_connections: int = int(os.getenv("POSTGRES_POOL_MIN_CONNECTIONS", "1"))
+    _max_connections: int = int(os.getenv("POSTGRES_POOL_MAX_CONNECTIONS", "5"))
+
+    _partitioned_tables: Set[str] = set()
+
+    # bulk load settings, see bulk_insert_rows
+    bulk_load_method: str = os.getenv("POSTGRES_BULK_LOAD_METHOD", "copy")
+    bulk_load_chunk_size: int = int(os.getenv("POSTGRES_BULK_LOAD_CHUNK_SIZE", "10000"))
+    # marker of NULL values in the COPY csv data, so empty strings stay empty strings
+    copy_null_marker: str = "\\N"
+
     def __init__(self):
         self.conn = None
         self.cursor = None
         self.connect()
 
+    def __enter__(self) -> "PostgresManager":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    @classmethod
+    def initialize_pool(cls) -> None:
+        """initialize the connection pool of the POSTGRES database with config set in .env, only once per process
+        """
+        with cls._pool_lock:
+            if cls._pool is not None and cls._pool_pid == os.getpid():
+                return
+
+            # connections inherited through fork must not be used, create a new pool for this process
+            print(f"Create PostgreSQL connection pool for process {os.getpid()}")
+            cls._pool = ThreadedConnectionPool(
+                cls._min_connections,
+                cls._max_connections,
+                host=os.getenv("POSTGRES_HOST"),
+                port=os.getenv("POSTGRES_PORT"),
+                database=os.getenv("POSTGRES_DATABASE"),
+                user=os.getenv("POSTGRES_USER"),
+                password=os.getenv("POSTGRES_PASSWORD")
+            )
+            cls._pool_pid = os.getpid()
+
+    @staticmethod
+    def _is_healthy(conn: psycopg2.extensions.connection) -> bool:
+        # a pooled connection may have been closed by the server (restart, idle timeout) since it was returned
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            return False
+
+    @classmethod
+    def acquire_connection(cls) -> psycopg2.extensions.connection:
+        """check out a healthy connection from the pool, broken connections are discarded
+
+        Raises:
+            psycopg2.pool.PoolError: all connections of the pool are checked out
+            psycopg2.OperationalError: a new connection can't be opened
+
+        Returns:
+            psycopg2.extensions.connection: connection, to be returned with release_connection
+        """
+        cls.initialize_pool()
+
+        # every pooled connection may be broken after a server restart, plus one newly opened connection
+        for _ in range(cls._max_connections + 1):
+            conn = cls._pool.getconn()
+            if cls._is_healthy(conn):
+                return conn
+
+            print("Discard broken PostgreSQL connection from pool")
+            cls._pool.putconn(conn, close=True)
+
+        raise psycopg2.OperationalError("Can't get a healthy PostgreSQL connection from pool")
+
+    @classmethod
+    def release_connection(cls, conn: psycopg2.extensions.connection) -> None:
+        """return a connection to the pool, its uncommitted changes are rolled back
+
+        Args:
+            conn (psycopg2.extensions.connection): connection checked out with acquire_connection
+        """
+        if cls._pool is None or cls._pool_pid != os.getpid():
+            return
+
+        if not conn.closed and conn.get_transaction_status() != TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                pass
+
+        cls._pool.putconn(conn, close=bool(conn.closed))
+
+    @classmethod
+    def close_pool(cls) -> None:
+        """close every connection of the pool of this process
+        """
+        with cls._pool_lock:
+            if cls._pool is not None and cls._pool_pid == os.getpid():
+                cls._pool.closeall()
+            cls._pool = None
+            cls._pool_pid = None
+
+    @classmethod
+    def _reset_after_fork(cls) -> None:
+        # the lock may have been held by another thread at fork time, and the parent's connections are unusable
+        cls._pool_lock = threading.Lock()
+        cls._pool = None
+        cls._pool_pid = None
+        cls._partitioned_tables = set()
+
     def connect(self) -> None:
-        """connect the POSTGRES database with config set in .env
-        """
-        self.conn = psycopg2.connect(
-            host=os.getenv("POSTGRES_HOST"),
-            port=os.getenv("POSTGRES_PORT"),
-            database=os.getenv("POSTGRES_DATABASE"),
-            user=os.getenv("POSTGRES_USER"),
-            password=os.getenv("POSTGRES_PASSWORD")
-        )
+        """check out a connection of the POSTGRES database from the pool
+        """
+        self.conn = self.acquire_connection()
         self.cursor = self.conn.cursor()
 
     def close(self):
-        """close the cursor and conn
+        """close the cursor and return conn to the pool
         """
         if self.cursor is not None:
             self.cursor.close()
+            self.cursor = None
         if self.conn is not None:
-            self.conn.close()
+            self.release_connection(self.conn)
+            self.conn = None
 
     def commit(self):
         """commit the executions
         """
         if self.conn is not None:
             self.conn.commit()
+
+    @classmethod
+    def copy_rows(cls,
+                  cursor: psycopg2.extensions.cursor,
+                  table_name: str,
+                  columns: Sequence[str],
+                  rows: Iterable[Sequence[Any]],
+                  chunk_size: Optional[int] = None) -> int:
+        """stream rows into table with COPY FROM STDIN, one COPY per chunk of chunk_size rows,
+        so only one chunk is buffered in memory
+
+        Args:
+            cursor (psycopg2.extensions.cursor): postgres database cursor
+            table_name (str): table name string
+            columns (Sequence[str]): column names, in the order of the row values
+            rows (Iterable[Sequence[Any]]): row values, can be a lazy iterator
+            chunk_size (Optional[int], optional): number of rows per COPY. Defaults to POSTGRES_BULK_LOAD_CHUNK_SIZE.
+
+        Returns:
+            int: number of copied rows
+        """
+        copy_query = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv, NULL {})").format(
+            sql.Identifier(table_name),
+            sql.SQL(", ").join(map(sql.Identifier, columns)),
+            sql.Literal(cls.copy_null_marker),
+        ).as_string(cursor)
+
+        row_count = 0
+        for chunk in split_into_chunks(rows, chunk_size or cls.bulk_load_chunk_size):
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in chunk:
+                writer.writerow([cls.copy_null_marker if value is None else value for value in row])
+            buffer.seek(0)
+
+            cursor.copy_expert(copy_query, buffer)
+            row_count += len(chunk)
+
+        return row_count
+
+    @classmethod
+    def insert_rows(cls,
+                    cursor: psycopg2.extensions.cursor,
+                    table_name: str,
+                    columns: Sequence[str],
+                    rows: Iterable[Sequence[Any]],
+                    chunk_size: Optional[int] = None) -> int:
+        """insert rows into table with multi-row INSERT statements of chunk_size rows (execute_values),
+        for servers / proxies where COPY is not available
+
+        Args:
+            cursor (psycopg2.extensions.cursor): postgres database cursor
+            table_name (str): table name string
+            columns (Sequence[str]): column names, in the order of the row values
+            rows (Iterable[Sequence[Any]]): row values, can be a lazy iterator
+            chunk_size (Optional[int], optional): number of rows per INSERT. Defaults to POSTGRES_BULK_LOAD_CHUNK_SIZE.
+
+        Returns:
+            int: number of inserted rows
+        """
+        chunk_size = chunk_size or cls.bulk_load_chunk_size
+        insert_query = sql.SQL("INSERT INTO {} ({}) VALUES %s").format(
+            sql.Identifier(table_name),
+            sql.SQL(", ").join(map(sql.Identifier, columns)),
+        ).as_string(cursor)
+
+        row_count = 0
+        for chunk in split_into_chunks(rows, chunk_size):
+            execute_values(cursor, insert_query, chunk, page_size=chunk_size)
+            row_count += len(chunk)
+
+        return row_count
+
+    @classmethod
+    def bulk_insert_rows(cls,
+                         cursor: psycopg2.extensions.cursor,
+                         table_name: str,
+                         columns: Sequence[str],
+                         rows: Iterable[Sequence[Any]],
+                         chunk_size: Optional[int] = None,
+                         method: Optional[str] = None) -> int:
+        """bulk insert rows into table, with COPY (default) or execute_values
+
+        Args:
+            cursor (psycopg2.extensions.cursor): postgres database cursor
+            table_name (str): table name string
+            columns (Sequence[str]): column names, in the order of the row values
+            rows (Iterable[Sequence[Any]]): row values, can be a lazy iterator
+            chunk_size (Optional[int], optional): number of rows per statement. Defaults to POSTGRES_BULK_LOAD_CHUNK_SIZE.
+            method (Optional[str], optional): 'copy' or 'execute_values'. Defaults to POSTGRES_BULK_LOAD_METHOD.
+
+        Raises:
+            ValueError: unknown bulk load method
+
+        Returns:
+            int: number of inserted rows
+        """
+        method = method or cls.bulk_load_method
+
+        if method == "copy":
+            return cls.copy_rows(cursor, table_name, columns, rows, chunk_size)
+        if method == "execute_values":
+            return cls.insert_rows(cursor, table_name, columns, rows, chunk_size)
+
+        raise ValueError(f"Unknown bulk load method '{method}', it should be either 'copy' or 'execute_values'")
+
+    @classmethod
+    def upsert_rows(cls,
+                    cursor: psycopg2.extensions.cursor,
+                    table_name: str,
+                    columns: Sequence[str],
+                    rows: Iterable[Sequence[Any]],
+                    conflict_columns: Sequence[str],
+                    chunk_size: Optional[int] = None,
+                    method: Optional[str] = None) -> int:
+        """upsert rows into table on its natural key, so loading the same rows again is a no-op.
+
+        Rows are bulk loaded into a temp table first (see bulk_insert_rows), then merged with one
+        set-based INSERT ... SELECT ... ON CONFLICT (conflict_columns) DO UPDATE statement.
+        conflict_columns must be covered by a unique constraint of the table
+
+        Args:
+            cursor (psycopg2.extensions.cursor): postgres database cursor
+            table_name (str): table name string
+            columns (Sequence[str]): column names, in the order of the row values
+            rows (Iterable[Sequence[Any]]): row values, can be a lazy iterator
+            conflict_columns (Sequence[str]): natural key columns, eg. ['symbol', 'date']
+            chunk_size (Optional[int], optional): number of rows per bulk load statement. Defaults to POSTGRES_BULK_LOAD_CHUNK_SIZE.
+            method (Optional[str], optional): 'copy' or 'execute_values'. Defaults to POSTGRES_BULK_LOAD_METHOD.
+
+        Returns:
+            int: number of inserted or updated rows
+        """
+        staging_table_name = f"{table_name}__upsert"
+        column_identifiers = sql.SQL(", ").join(map(sql.Identifier, columns))
+        conflict_identifiers = sql.SQL(", ").join(map(sql.Identifier, conflict_columns))
+
+        # same column types as the target table, without its constraints / defaults
+        cursor.execute(sql.SQL("CREATE TEMP TABLE {} ON COMMIT DROP AS SELECT {} FROM {} WITH NO DATA").format(
+            sql.Identifier(staging_table_name),
+            column_identifiers,
+            sql.Identifier(table_name),
+        ))
+
+        cls.bulk_insert_rows(cursor, staging_table_name, columns, rows, chunk_size, method)
+
+        update_columns = [column for column in columns if column not in conflict_columns]
+        conflict_action = sql.SQL("DO UPDATE SET {}").format(sql.SQL(", ").join(
+            sql.SQL("{} = EXCLUDED.{}").format(sql.Identifier(column), sql.Identifier(column))
+            for column in update_columns
+        )) if update_columns else sql.SQL("DO NOTHING")
+
+        # DISTINCT ON, a row can't be updated twice by the same statement when the input repeats a key
+        cursor.execute(sql.SQL(
+            "INSERT INTO {} ({}) SELECT DISTINCT ON ({}) {} FROM {} ORDER BY {} ON CONFLICT ({}) {}"
+        ).format(
+            sql.Identifier(table_name),
+            column_identifiers,
+            conflict_identifiers,
+            column_identifiers,
+            sql.Identifier(staging_table_name),
+            conflict_identifiers,
+            conflict_identifiers,
+            conflict_action,
+        ))
+        upserted_count = cursor.rowcount
+
+        # dropped explicitly as well, the same table may be upserted again before commit
+        cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(staging_table_name)))
+
+        return upserted_count
+
+    @classmethod
+    def ensure_partitions(cls, table_name: str) -> None:
+        """create the missing yearly partitions of a table declared in POSTGRES_PARTITION_REGISTRY,
+        only checked once per process for each table.
+
+        Partitions are created and committed on their own pooled connection, so they are never rolled back
+        with a failed load (rows would then go to the default partition and block creating the partition later)
+
+        Args:
+            table_name (str): table name string
+        """
+        if table_name in cls._partitioned_tables or table_name not in POSTGRES_PARTITION_REGISTRY:
+            return
+
+        conn = cls.acquire_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "SELECT child.relname FROM pg_inherits "
+                    "JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+                    "JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+                    "WHERE parent.relname = %s",
+                    (table_name,),
+                )
+                existing_partitions = {row[0] for row in cursor.fetchall()}
+
+                for partition_name, from_date, to_date in get_partition_bounds(table_name):
+                    if partition_name in existing_partitions:
+                        continue
+
+                    cursor.execute(
+                        sql.SQL("CREATE TABLE IF NOT EXISTS {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)").format(
+                            sql.Identifier(partition_name),
+                            sql.Identifier(table_name),
+                        ),
+                        (from_date.isoformat(), to_date.isoformat()),
+                    )
+                    print(f"Created partition '{partition_name}' of '{table_name}' for [{from_date}, {to_date})")
+
+            conn.commit()
+        finally:
+            cls.release_connection(conn)
+
+        cls._partitioned_tables.add(table_name)
+
+os.register_at_fork(after_in_child=PostgresManager._reset_after_fork)
@@ -0,0 +1,43 @@
+from datetime import date
+from typing import Dict, Any, List, Tuple
+
+
+# date range partitioned tables, one partition per year from first_year up to years_ahead after the current year.
+# rows outside of the created partitions go to the '<table>_default' partition
+POSTGRES_PARTITION_REGISTRY: Dict[str, Dict[str, Any]] = {
+    "stock": {
+        "partition_key": "date",
+        "first_year": 1980,
+        "years_ahead": 1,
+    },
+    "crypto": {
+        "partition_key": "date",
+        "first_year": 2010,
+        "years_ahead": 1,
+    },
+}
+
+
+def get_partition_bounds(table_name: str, until_year: int = None) -> List[Tuple[str, date, date]]:
+    """get the yearly partitions a registered table should have
+
+    Args:
+        table_name (str): table name string
+        until_year (int, optional): last year to be covered. Defaults to current year + years_ahead.
+
+    Raises:
+        ValueError: the table is not registered as partitioned
+
+    Returns:
+        List[Tuple[str, date, date]]: partition name, inclusive lower bound and exclusive upper bound
+    """
+    if table_name not in POSTGRES_PARTITION_REGISTRY:
+        raise ValueError(f"'{table_name}' is not registered in POSTGRES_PARTITION_REGISTRY")
+
+    partition_config = POSTGRES_PARTITION_REGISTRY[table_name]
+    until_year = until_year or date.today().year + partition_config["years_ahead"]
+
+    return [
+        (f"{table_name}_y{year}", date(year, 1, 1), date(year + 1, 1, 1))
+        for year in range(partition_config["first_year"], until_year + 1)
+    ]
@@ -0,0 +1,83 @@
+from datetime import date
+from typing import Dict, List, Optional
+import psycopg2
+
+
+class WatermarkManager:
+    """ WatermarkManager class responsible for
+        - reading / writing the last processed date per (asset type, symbol, stage) in the 'pipeline_watermark' table
+        - letting the incremental jobs plan their work without scanning the price data
+
+    Methods take the cursor of the caller, so a watermark is committed in the same transaction as the data it describes.
+    A watermark only moves forward, and a missing watermark means the caller should fall back to scanning the data
+    """
+    ingested_stage: str = "ingested"
+    standardized_stage: str = "standardized"
+
+    @staticmethod
+    def _to_date_string(value: Optional[date]) -> Optional[str]:
+        return value.strftime("%Y-%m-%d") if value is not None else None
+
+    @classmethod
+    def get_watermark(cls, cursor: psycopg2.extensions.cursor, asset_type: str, symbol: str, stage: str) -> Optional[str]:
+        """get the last processed date of a symbol in a stage
+
+        Args:
+            cursor (psycopg2.extensions.cursor): postgres database cursor
+            asset_type (str): 'stock' or 'crypto'
+            symbol (str): unique symbol defining the asset
+            stage (str): 'ingested' or 'standardized'
+
+        Returns:
+            Optional[str]: last processed date in 'YYYY-MM-DD', None if the symbol has no watermark yet
+        """
+        cursor.execute(
+            "SELECT last_date FROM pipeline_watermark WHERE asset_type = %s AND symbol = %s AND stage = %s",
+            (asset_type, symbol, stage),
+        )
+        result = cursor.fetchone()
+
+        return cls._to_date_string(result[0]) if result is not None else None
+
+    @classmethod
+    def get_watermarks(cls, cursor: psycopg2.extensions.cursor, asset_type: str, symbols: List[str], stage: str) -> Dict[str, str]:
+        """get the last processed dates of many symbols in a stage, with one query
+
+        Args:
+            cursor (psycopg2.extensions.cursor): postgres database cursor
+            asset_type (str): 'stock' or 'crypto'
+            symbols (List[str]): unique symbols defining the assets
+            stage (str): 'ingested' or 'standardized'
+
+        Returns:
+            Dict[str, str]: last processed date in 'YYYY-MM-DD' keyed by symbol, symbols without watermark are left out
+        """
+        cursor.execute(
+            "SELECT symbol, last_date FROM pipeline_watermark WHERE asset_type = %s AND stage = %s AND symbol = ANY(%s)",
+            (asset_type, stage, list(symbols)),
+        )
+
+        return {symbol: cls._to_date_string(last_date) for symbol, last_date in cursor.fetchall()}
+
+    @staticmethod
+    def update_watermark(cursor: psycopg2.extensions.cursor, asset_type: str, symbol: str, stage: str, last_date: str) -> None:
+        """move the watermark of a symbol in a stage forward to last_date, an older date leaves it unchanged
+
+        Args:
+            cursor (psycopg2.extensions.cursor): postgres database cursor
+            asset_type (str): 'stock' or 'crypto'
+            symbol (str): unique symbol defining the asset
+            stage (str): 'ingested' or 'standardized'
+            last_date (str): last processed date in 'YYYY-MM-DD'
+        """
+        cursor.execute(
+            """
+            INSERT INTO pipeline_watermark (asset_type, symbol, stage, last_date, updated_at)
+            VALUES (%s, %s, %s, %s, NOW())
+            ON CONFLICT (asset_type, symbol, stage) DO UPDATE SET
+                last_date = GREATEST(pipeline_watermark.last_date, EXCLUDED.last_date),
+                updated_at = NOW()
+            """,
+            (asset_type, symbol, stage, last_date),
+        )
+        print(f"Watermark of {asset_type} '{symbol}' at stage '{stage}' moved to {last_date}")
@@ -0,0 +1,172 @@
+import os
+import time
+import queue
+import threading
+from dotenv import load_dotenv
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+
+from InvestmentAsCode_AssetFlowPlatform.data_processing.loaders.loader import Loader
+from InvestmentAsCode_AssetFlowPlatform.data_processing.savers.saver import Saver
+
+load_dotenv()
+
+
+class StagePipeline:
+    """ StagePipeline class responsible for
+        - streaming data batches from a Loader, through transform stages, into a Saver
+        - running every stage in its own thread, connected by bounded queues
+
+    A stage blocks when the queue of the next stage is full, so at most queue_size batches wait between two stages
+    and memory is bounded by the batch size whatever the data size is; I/O of the loader and the saver overlap.
+    A failed stage stops the other ones, and its error is raised by run, the saver never sees a partial stream as complete
+
+    Usage:
+        pipeline = StagePipeline(api_loader, saver, transforms=[add_date_to_data], batch_size=5000)
+        pipeline.run()
+    """
+    queue_size: int = int(os.getenv("STAGE_PIPELINE_QUEUE_SIZE", "2"))
+    # how often a blocked stage checks whether the pipeline is stopped
+    poll_seconds: float = 0.1
+
+    _end_of_stream = object()
+
+    def __init__(self,
+                 loader: Loader,
+                 saver: Saver,
+                 transforms: Optional[List[Callable[[List[Any]], List[Any]]]] = None,
+                 batch_size: int = 1000,
+                 queue_size: Optional[int] = None,
+                 save_batches: Optional[Callable[[Iterable[List[Any]]], Any]] = None):
+        """
+        Args:
+            loader (Loader): source of the batches, see Loader.iter_batches
+            saver (Saver): destination of the batches, see Saver.save_batches
+            transforms (Optional[List[Callable[[List[Any]], List[Any]]]], optional): functions applied to each batch in order. Defaults to None, no transform.
+            batch_size (int, optional): number of items per batch. Defaults to 1000.
+            queue_size (Optional[int], optional): max number of batches waiting between two stages. Defaults to STAGE_PIPELINE_QUEUE_SIZE.
+            save_batches (Optional[Callable[[Iterable[List[Any]]], Any]], optional): saver method consuming the batches,
+                eg. saver.replace_collection_in_batches. Defaults to None, saver.save_batches.
+
+        Raises:
+            ValueError: batch_size or queue_size is less than 1
+        """
+        self.loader = loader
+        self.saver = saver
+        self.transforms = transforms or []
+        self.batch_size = batch_size
+        self.queue_size = queue_size or self.queue_size
+        self.save_batches = save_batches or saver.save_batches
+
+        if self.batch_size < 1 or self.queue_size < 1:
+            raise ValueError(f"batch_size and queue_size should be at least 1, instead they are {self.batch_size} and {self.queue_size}")
+
+        self._stop_event = threading.Event()
+        self._errors: List[BaseException] = []
+
+    def _fail(self, error: BaseException) -> None:
+        # the error is recorded before the other stages see the stop
+        self._errors.append(error)
+        self._stop_event.set()
+
+    def _put(self, output_queue: queue.Queue, batch: Any) -> bool:
+        while not self._stop_event.is_set():
+            try:
+                output_queue.put(batch, timeout=self.poll_seconds)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _iter_queue(self, input_queue: queue.Queue, raise_on_stop: bool = False) -> Iterator[List[Any]]:
+        """yield the batches of a queue until the end of stream, or until the pipeline is stopped
+
+        Args:
+            input_queue (queue.Queue): queue filled by the previous stage
+            raise_on_stop (bool, optional): raise the stage error when stopped, instead of ending quietly. Defaults to False.
+
+        Raises:
+            Exception: error of the failed stage, when raise_on_stop
+
+        Yields:
+            Iterator[List[Any]]: batches of the previous stage
+        """
+        while True:
+            if self._stop_event.is_set():
+                if raise_on_stop:
+                    raise self._errors[0]
+                return
+
+            try:
+                batch = input_queue.get(timeout=self.poll_seconds)
+            except queue.Empty:
+                continue
+
+            if batch is self._end_of_stream:
+                return
+            yield batch
+
+    def _iter_transformed(self, transform: Callable[[List[Any]], List[Any]], input_queue: queue.Queue) -> Iterator[List[Any]]:
+        # a function of its own, so each stage keeps its transform instead of the loop variable of run
+        for batch in self._iter_queue(input_queue):
+            yield transform(batch)
+
+    def _run_stage(self, stage_name: str, batches: Iterable[List[Any]], output_queue: queue.Queue) -> None:
+        try:
+            for batch in batches:
+                if not self._put(output_queue, batch):
+                    return
+            self._put(output_queue, self._end_of_stream)
+        except Exception as error:
+            print(f"Error: stage '{stage_name}' failed, {error}")
+            self._fail(error)
+
+    def run(self) -> Any:
+        """run the pipeline until the saver has consumed every batch
+
+        Raises:
+            Exception: error of the first failed stage
+
+        Returns:
+            Any: result of the save_batches method
+        """
+        self._stop_event = threading.Event()
+        self._errors = []
+
+        # queues[i] feeds transforms[i], the last one feeds the saver
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.transforms) + 1)]
+        stages = [("load", self.loader.iter_batches(self.batch_size))]
+        for index, transform in enumerate(self.transforms):
+            stages.append((
+                getattr(transform, "__name__", f"transform_{index}"),
+                self._iter_transformed(transform, queues[index]),
+            ))
+
+        threads = [
+            threading.Thread(target=self._run_stage,
+                             args=(stage_name, batches, queues[index]),
+                             name=f"stage-{stage_name}",
+                             daemon=True)
+            for index, (stage_name, batches) in enumerate(stages)
+        ]
+
+        print(f"Start pipeline with stages {[stage_name for stage_name, _ in stages] + ['save']}, "
+              f"batch size = {self.batch_size}, queue size = {self.queue_size}")
+        start_time = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        try:
+            result = self.save_batches(self._iter_queue(queues[-1], raise_on_stop=True))
+        except BaseException as error:
+            if not self._errors:
+                self._fail(error)
+            raise
+        finally:
+            # also releases the stages blocked on a full queue when the saver stopped reading early
+            self._stop_event.set()
+            for thread in threads:
+                thread.join()
+
+        print(f"Finish pipeline in {time.perf_counter() - start_time:.2f}s")
+
+        return result
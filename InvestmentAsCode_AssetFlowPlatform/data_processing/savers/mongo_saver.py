@@ -1,9 +1,14 @@
 import os
-from pymongo import MongoClient
-from typing import Dict, Any, List
+import time
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from pymongo import MongoClient, UpdateOne
+from pymongo.collection import Collection
+from typing import Dict, Any, List, Iterable, Optional, Set
 
 from .saver import Saver
 from InvestmentAsCode_AssetFlowPlatform.data_processing.managers.mongo_manager import MongoDBManager
+from InvestmentAsCode_AssetFlowPlatform.data_processing.managers.mongo_timeseries_storage import MongoTimeSeriesStorage
+from InvestmentAsCode_AssetFlowPlatform.utils.common_utils import split_into_chunks
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -11,6 +16,11 @@ load_dotenv()
 class MongoSaver(Saver):
     """Child class to save data to MongoDB"""
 
+    staging_collection_suffix: str = "__staging"
+    # parallel chunked writer, see save_data_in_chunks
+    writer_max_workers: int = int(os.getenv("MONGO_WRITER_MAX_WORKERS", "4"))
+    writer_max_in_flight: int = int(os.getenv("MONGO_WRITER_MAX_IN_FLIGHT", "8"))
+
     def __init__(self, config: Dict[str, str]):
         super().__init__(config)
 
@@ -20,6 +30,40 @@ class MongoSaver(Saver):
         self.manager = MongoDBManager()
         self.client = self.manager.connect_mongo_db()
 
+    def _get_timeseries_storage(self) -> Optional[MongoTimeSeriesStorage]:
+        """get the time-series storage when collection_name is a per-symbol collection stored in it
+
+        Returns:
+            Optional[MongoTimeSeriesStorage]: storage, None when collection_name is a real collection
+        """
+        timeseries_storage = self.manager.get_timeseries_storage(self.database_name)
+        if timeseries_storage is None or not timeseries_storage.is_virtual_collection(self.collection_name):
+            return None
+        return timeseries_storage
+
+    def _get_collection(self) -> Collection:
+        """get the collection physically holding the target collection's data
+
+        Returns:
+            Collection: MongoDB collection
+        """
+        timeseries_storage = self._get_timeseries_storage()
+        collection_name = timeseries_storage.collection_name if timeseries_storage is not None else self.collection_name
+        return self.client[self.database_name][collection_name]
+
+    def _to_storage_documents(self, data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """convert the documents into the time-series format when the collection is stored in a time-series collection
+
+        Args:
+            data (List[Dict[str, Any]]): data to be stored
+
+        Returns:
+            List[Dict[str, Any]]: data in the format of the physical collection
+        """
+        timeseries_storage = self._get_timeseries_storage()
+        if timeseries_storage is None:
+            return data
+        return [timeseries_storage.to_storage_document(item, self.collection_name) for item in data]
 
     def save_data(self, data: List[Dict[str, Any]]) -> None:
         """save data into existing collection in database
@@ -27,21 +71,234 @@ class MongoSaver(Saver):
         Args:
             data (List[Dict[str, Any]]): data to be stored, in a list of dictionaries format
         """
-        db = self.client[self.database_name]
-        collection = db[self.collection_name]
+        collection = self._get_collection()
+        data = self._to_storage_documents(data)
+
+        self.manager.ensure_indexes(self.client, self.database_name, self.collection_name)
 
         # Insert each item into the collection
         print(f"Start writing data to MongoDB [Database: {self.database_name}], [Collection: {self.collection_name}]")
         collection.insert_many(data)
+        # the write may have created the database / collection
+        self.manager.invalidate_metadata_cache(self.database_name)
         print(f"Finish writing data to MongoDB")
 
-    def replace_collection(self, data: List[Dict[str, Any]]) -> None:
-        """replace the entire collection with input data
+    def _write_chunks_in_parallel(self,
+                                  collection: Collection,
+                                  chunks: Iterable[List[Dict[str, Any]]],
+                                  max_workers: Optional[int] = None,
+                                  max_in_flight: Optional[int] = None) -> Dict[str, float]:
+        """insert chunks from a small thread pool while the caller keeps producing the next chunks.
+        At most max_in_flight chunks are queued or being written, producing blocks when the queue is full,
+        so memory stays bounded when the producer is faster than MongoDB
+
+        Args:
+            collection (Collection): MongoDB collection to write to
+            chunks (Iterable[List[Dict[str, Any]]]): data chunks, one insert_many per chunk
+            max_workers (Optional[int], optional): number of writer threads. Defaults to MONGO_WRITER_MAX_WORKERS.
+            max_in_flight (Optional[int], optional): max number of chunks queued or being written. Defaults to MONGO_WRITER_MAX_IN_FLIGHT.
+
+        Raises:
+            pymongo.errors.PyMongoError: a chunk failed to be written, the chunks not sent yet are cancelled
+
+        Returns:
+            Dict[str, float]: number of written 'documents' and 'chunks', elapsed 'seconds' and 'documents_per_second'
+        """
+        max_workers = max_workers or self.writer_max_workers
+        max_in_flight = max(max_in_flight or self.writer_max_in_flight, max_workers)
+
+        write_stats = {"documents": 0, "chunks": 0, "seconds": 0.0, "documents_per_second": 0.0}
+        start_time = time.perf_counter()
+        in_flight: Set[Future] = set()
+
+        def collect_finished(finished: Set[Future]) -> None:
+            for future in finished:
+                # re-raise the write error of the chunk
+                write_stats["documents"] += future.result()
+                write_stats["chunks"] += 1
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mongo-writer") as executor:
+            try:
+                for chunk in chunks:
+                    if not chunk:
+                        continue
+                    if len(in_flight) >= max_in_flight:
+                        finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        collect_finished(finished)
+
+                    in_flight.add(executor.submit(
+                        lambda chunk: len(collection.insert_many(chunk, ordered=False).inserted_ids), chunk
+                    ))
+
+                finished, in_flight = wait(in_flight)
+                collect_finished(finished)
+            except BaseException:
+                for future in in_flight:
+                    future.cancel()
+                raise
+
+        write_stats["seconds"] = time.perf_counter() - start_time
+        if write_stats["seconds"] > 0:
+            write_stats["documents_per_second"] = write_stats["documents"] / write_stats["seconds"]
+
+        print(f"Written {write_stats['documents']} documents in {write_stats['chunks']} chunks "
+              f"in {write_stats['seconds']:.2f}s ({write_stats['documents_per_second']:.0f} documents/s)")
+
+        return write_stats
+
+    def save_data_in_chunks(self,
+                            data: Iterable[Dict[str, Any]],
+                            chunk_size: int = 1000,
+                            max_workers: Optional[int] = None,
+                            max_in_flight: Optional[int] = None) -> Dict[str, float]:
+        """save data into collection in chunks of chunk_size items, written in parallel in the background,
+        so an input iterator (eg. a streamed API response) is parsed while the previous chunks are written
+
+        Args:
+            data (Iterable[Dict[str, Any]]): data to be stored, in a list (or iterator) of dictionaries format
+            chunk_size (int, optional): number of items per insert. Defaults to 1000.
+            max_workers (Optional[int], optional): number of writer threads. Defaults to MONGO_WRITER_MAX_WORKERS.
+            max_in_flight (Optional[int], optional): max number of chunks queued or being written. Defaults to MONGO_WRITER_MAX_IN_FLIGHT.
+
+        Returns:
+            Dict[str, float]: number of written 'documents' and 'chunks', elapsed 'seconds' and 'documents_per_second'
+        """
+        collection = self._get_collection()
+
+        self.manager.ensure_indexes(self.client, self.database_name, self.collection_name)
+
+        print(f"Start writing data in chunks to MongoDB [Database: {self.database_name}], [Collection: {self.collection_name}]")
+        chunks = (self._to_storage_documents(chunk) for chunk in split_into_chunks(data, chunk_size))
+        write_stats = self._write_chunks_in_parallel(collection, chunks, max_workers, max_in_flight)
+
+        # the write may have created the database / collection
+        self.manager.invalidate_metadata_cache(self.database_name)
+        print(f"Finish writing data to MongoDB")
+
+        return write_stats
+
+    def save_batches(self, batches: Iterable[List[Dict[str, Any]]]) -> Dict[str, float]:
+        """save data batches into collection, written in parallel while the next batches are produced
+
+        Args:
+            batches (Iterable[List[Dict[str, Any]]]): data to be stored, in batches of list of dictionaries
+
+        Returns:
+            Dict[str, float]: number of written 'documents' and 'chunks', elapsed 'seconds' and 'documents_per_second'
+        """
+        return self.save_data_in_chunks(item for batch in batches for item in batch)
+
+    def upsert_data(self, data: Iterable[Dict[str, Any]], key_fields: List[str], chunk_size: int = 1000) -> Dict[str, int]:
+        """upsert data into collection, matching existing items on key_fields, so writing the same data again is a no-op.
+        Data is sent in unordered bulk writes of chunk_size items
+
+        Args:
+            data (Iterable[Dict[str, Any]]): data to be stored, in a list (or iterator) of dictionaries format
+            key_fields (List[str]): fields identifying an item, eg. ['stock_symbol', 'date']
+            chunk_size (int, optional): number of items per bulk write. Defaults to 1000.
+
+        Returns:
+            Dict[str, int]: number of 'inserted', 'updated' and 'unchanged' items
+        """
+        collection = self._get_collection()
+
+        self.manager.ensure_indexes(self.client, self.database_name, self.collection_name)
+
+        print(f"Start upserting data to MongoDB [Database: {self.database_name}], [Collection: {self.collection_name}], keys: {key_fields}")
+        upsert_counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+
+        for chunk in split_into_chunks(data, chunk_size):
+            if self._get_timeseries_storage() is not None:
+                # time-series collections don't support upserts, only insert the keys which are not stored yet
+                chunk = self._to_storage_documents(chunk)
+                existing_keys = {
+                    tuple(item[key] for key in key_fields)
+                    for item in collection.find(
+                        {"$or": [{key: item[key] for key in key_fields} for item in chunk]},
+                        {key: 1 for key in key_fields},
+                    )
+                }
+                new_items = [item for item in chunk if tuple(item[key] for key in key_fields) not in existing_keys]
+                if new_items:
+                    collection.insert_many(new_items, ordered=False)
+
+                upsert_counts["inserted"] += len(new_items)
+                upsert_counts["unchanged"] += len(chunk) - len(new_items)
+                continue
+
+            operations = [
+                UpdateOne(
+                    {key: item[key] for key in key_fields},
+                    {"$set": {key: value for key, value in item.items() if key != "_id"}},
+                    upsert=True,
+                )
+                for item in chunk
+            ]
+            result = collection.bulk_write(operations, ordered=False)
+
+            upsert_counts["inserted"] += result.upserted_count
+            upsert_counts["updated"] += result.modified_count
+            upsert_counts["unchanged"] += result.matched_count - result.modified_count
+
+        # the write may have created the database / collection
+        self.manager.invalidate_metadata_cache(self.database_name)
+        print(f"Finish upserting data to MongoDB: {upsert_counts}")
+
+        return upsert_counts
+
+    def replace_collection(self, data: List[Dict[str, Any]], chunk_size: int = 5000) -> None:
+        """replace the entire collection with input data, see replace_collection_in_batches
 
         Args:
             data (List[Dict[str, Any]]): data to be stored, in a list of dictionaries format
+            chunk_size (int, optional): number of items per insert. Defaults to 5000.
+        """
+        self.replace_collection_in_batches(split_into_chunks(data, chunk_size))
+
+    def replace_collection_in_batches(self, batches: Iterable[List[Dict[str, Any]]]) -> None:
+        """replace the entire collection with input data batches, only one batch is held in memory at a time.
+
+        Data is written into a staging collection with the registered indexes built first,
+        then renamed over the target collection with dropTarget, so readers always see either
+        the previous or the new complete collection, never a missing or half-filled one
+
+        Args:
+            batches (Iterable[List[Dict[str, Any]]]): data to be stored, in batches of list of dictionaries
         """
+        if self._get_timeseries_storage() is not None:
+            # the symbol's data shares the time-series collection with other symbols, there is no collection to swap
+            self.manager.remove_collection(self.client, self.database_name, self.collection_name)
+            self.save_data_in_chunks(item for batch in batches for item in batch)
+            return
+
+        staging_collection_name = f"{self.collection_name}{self.staging_collection_suffix}"
+
+        # clean up the leftover of an interrupted previous run
         self.manager.remove_collection(self.client,
                                        self.database_name,
+                                       staging_collection_name)
+        self.manager.ensure_indexes(self.client,
+                                    self.database_name,
+                                    staging_collection_name,
+                                    index_collection_name=self.collection_name)
+
+        staging_collection = self.client[self.database_name][staging_collection_name]
+
+        print(f"Start writing data in batches to MongoDB [Database: {self.database_name}], [Collection: {staging_collection_name}]")
+        # the next batch is fetched / parsed while the previous ones are written
+        write_stats = self._write_chunks_in_parallel(staging_collection, batches)
+        document_count = write_stats["documents"]
+
+        if document_count == 0:
+            print(f"No data to write to MongoDB [Database: {self.database_name}], [Collection: {self.collection_name}], keep the existing collection")
+            self.manager.remove_collection(self.client,
+                                           self.database_name,
+                                           staging_collection_name)
+            return
+
+        self.manager.rename_collection(self.client,
+                                       self.database_name,
+                                       staging_collection_name,
                                        self.collection_name)
-        self.save_data(data)
+
+        print(f"Finish replacing [Collection: {self.collection_name}] with {document_count} documents")
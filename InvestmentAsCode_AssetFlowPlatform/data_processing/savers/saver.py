@@ -1,4 +1,5 @@
 from abc import ABC, abstractmethod
+from typing import Any, Iterable, List
 
 class Saver(ABC):
     """Interface class for Savers"""
@@ -11,3 +12,13 @@ class Saver(ABC):
     def save_data(self, data):
         # Save the data to the desired destination
         raise NotImplementedError("Subclasses must implement save_data()")
+
+    def save_batches(self, batches: Iterable[List[Any]]) -> None:
+        """save data batch by batch, see StagePipeline.
+        Subclasses able to overlap writes should override it
+
+        Args:
+            batches (Iterable[List[Any]]): data to be stored, in batches
+        """
+        for batch in batches:
+            self.save_data(batch)
@@ -0,0 +1,67 @@
+from typing import Dict, Any
+
+
+# postgres price table column -> mongodb price document field, shared by every asset type
+PRICE_COLUMN_FIELDS: Dict[str, str] = {
+    "date": "date",
+    "open": "open",
+    "high": "high",
+    "low": "low",
+    "close": "close",
+    "adj_close": "adjClose",
+    "volume": "volume",
+    "unadjusted_volume": "unadjustedVolume",
+    "change": "change",
+    "change_percent": "changePercent",
+    "vwap": "vwap",
+    "label": "label",
+    "change_over_time": "changeOverTime",
+}
+
+
+# price pipeline of each asset type, see AssetPipelineEngine
+ASSET_PIPELINE_CONFIGS: Dict[str, Dict[str, Any]] = {
+    "stock": {
+        "asset_type": "stock",
+        # field holding the symbol in the price documents
+        "symbol_key": "stock_symbol",
+        "price_api_url": "https://financialmodelingprep.com/api/v3/historical-price-full/{symbol}",
+        "api_key_name": "FMP_API_KEY",
+        "concurrency_limit": 10,
+        "list_database_name": "ingestion-general_info",
+        "list_collection_name": "stock_list",
+        "price_database_name": "ingestion-stock_price",
+        "price_table_name": "stock",
+        # postgres asset table column -> symbol list document field
+        "asset_info_fields": {
+            "name": "name",
+            "exchange": "exchange",
+            "exchange_short_name": "exchangeShortName",
+            "type": "type",
+            "as_of_date": "date",
+        },
+        # postgres asset table column -> fixed value
+        "asset_info_constants": {},
+        # symbols processed when the symbol universe has none of this asset type, see symbol_universe
+        "default_symbols": ["AAPL", "NVDA", "TSLA"],
+    },
+    "crypto": {
+        "asset_type": "crypto",
+        "symbol_key": "crypto_symbol",
+        "price_api_url": "https://financialmodelingprep.com/api/v3/historical-price-full/{symbol}",
+        "api_key_name": "FMP_API_KEY",
+        "concurrency_limit": 10,
+        "list_database_name": "ingestion-general_info",
+        "list_collection_name": "crypto_list",
+        "price_database_name": "ingestion-crypto_price",
+        "price_table_name": "crypto",
+        "asset_info_fields": {
+            "name": "name",
+            "exchange": "stockExchange",
+            "exchange_short_name": "exchangeShortName",
+            "as_of_date": "date",
+        },
+        "asset_info_constants": {"type": "crypto"},
+        "default_symbols": ["BTCUSD", "ETHUSD", "USDTUSD"],
+    },
+}
@@ -0,0 +1,579 @@
+from typing import List, Dict, Any, Iterable, Iterator, Optional
+import psycopg2
+from psycopg2 import sql
+from pymongo import ASCENDING
+
+from InvestmentAsCode_AssetFlowPlatform.data_processing.loaders.api_loader import (
+    ApiLoader,
+)
+from InvestmentAsCode_AssetFlowPlatform.data_processing.loaders.mongo_loader import (
+    MongoLoader,
+)
+from InvestmentAsCode_AssetFlowPlatform.data_processing.managers.postgres_manager import (
+    PostgresManager,
+)
+from InvestmentAsCode_AssetFlowPlatform.data_processing.managers.watermark_manager import (
+    WatermarkManager,
+)
+from InvestmentAsCode_AssetFlowPlatform.data_processing.savers.mongo_saver import (
+    MongoSaver,
+)
+from InvestmentAsCode_AssetFlowPlatform.jobs.asset_pipeline.asset_pipeline_config import (
+    ASSET_PIPELINE_CONFIGS,
+    PRICE_COLUMN_FIELDS,
+)
+from InvestmentAsCode_AssetFlowPlatform.utils.common_utils import get_next_date
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class AssetPipelineEngine:
+    """ AssetPipelineEngine class responsible for running the price pipeline of one asset type, for a batch of symbols
+        - ingest: fetch the daily prices after the ingested watermark from API, store them into MongoDB
+        - standardize: load the asset info and the prices after the standardized watermark from MongoDB into PostgreSQL
+        - ingest and standardize (fused): store the fetched prices into MongoDB and PostgreSQL from the same in-memory batch
+
+    The asset type is described by a config of ASSET_PIPELINE_CONFIGS. Clients, connections, the API session and
+    the reference lookups (symbol list, watermarks, stored max dates) are shared by the whole batch.
+    A failed symbol doesn't stop the others, the failures are raised together once the batch is done
+    """
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        self.asset_type = config["asset_type"]
+        self.symbol_key = config["symbol_key"]
+        self.price_table_name = config["price_table_name"]
+
+        self.list_loader = MongoLoader({
+            "database_name": config["list_database_name"],
+            "collection_name": config["list_collection_name"],
+        })
+        # collection_name is set per symbol
+        self.price_loader = MongoLoader({
+            "database_name": config["price_database_name"],
+            "collection_name": None,
+        })
+        self.price_api_loader = ApiLoader({
+            "api_url": config["price_api_url"],
+            "api_key_name": config["api_key_name"],
+            "parameters": {},
+        })
+
+    @classmethod
+    def from_asset_type(cls, asset_type: str) -> "AssetPipelineEngine":
+        """create the engine of an asset type registered in ASSET_PIPELINE_CONFIGS
+
+        Args:
+            asset_type (str): 'stock' or 'crypto'
+
+        Raises:
+            ValueError: the asset type is not registered
+
+        Returns:
+            AssetPipelineEngine: engine of the asset type
+        """
+        if asset_type not in ASSET_PIPELINE_CONFIGS:
+            raise ValueError(f"Unknown asset type '{asset_type}', it should be one of {list(ASSET_PIPELINE_CONFIGS)}")
+
+        return cls(ASSET_PIPELINE_CONFIGS[asset_type])
+
+    @staticmethod
+    def get_price_collection_name(symbol: str) -> str:
+        return symbol.upper()
+
+    def _raise_for_failed_symbols(self, stage: str, symbols: List[str], errors: Dict[str, Exception]) -> None:
+        if not errors:
+            return
+
+        error_messages = "; ".join(f"'{symbol}': {error}" for symbol, error in errors.items())
+        raise ValueError(f"Failed to {stage} {len(errors)} / {len(symbols)} {self.asset_type} symbols, {error_messages}")
+
+    def get_ingested_max_dates(self, cursor: psycopg2.extensions.cursor, symbols: List[str]) -> Dict[str, str]:
+        """get the latest date stored in MongoDB of each symbol, from the ingested watermarks,
+        with one aggregation over the price collections for the symbols without watermark yet
+
+        Args:
+            cursor (psycopg2.extensions.cursor): postgres database cursor
+            symbols (List[str]): unique symbols defining the assets
+
+        Returns:
+            Dict[str, str]: max 'date' keyed by symbol, symbols without stored prices are left out
+        """
+        max_dates = WatermarkManager.get_watermarks(cursor, self.asset_type, symbols, WatermarkManager.ingested_stage)
+
+        symbols_without_watermark = [symbol for symbol in symbols if symbol not in max_dates]
+        if symbols_without_watermark and not self.price_loader.manager.check_database_exists(
+            self.price_loader.client, self.config["price_database_name"]
+        ):
+            # first run, nothing is ingested yet: the full history of every symbol is fetched
+            print(f"No {self.asset_type} price stored in MongoDB yet, fetch the full history of {symbols_without_watermark}")
+        elif symbols_without_watermark:
+            print(f"No ingested watermark for {symbols_without_watermark}, find their max date in MongoDB")
+            collection_min_max_dates = self.price_loader.get_collections_min_max_dates(
+                [self.get_price_collection_name(symbol) for symbol in symbols_without_watermark], "date"
+            )
+            for symbol in symbols_without_watermark:
+                collection_name = self.get_price_collection_name(symbol)
+                if collection_name in collection_min_max_dates:
+                    max_dates[symbol] = collection_min_max_dates[collection_name][1]
+
+        return max_dates
+
+    def prepare_new_prices(self, symbol: str, response_data: Any, max_date: Optional[str]) -> List[Dict[str, Any]]:
+        """take the prices after max_date from the API response, with the symbol added to each price
+
+        Args:
+            symbol (str): unique symbol defining the asset
+            response_data (Any): API response data of the symbol, or the exception when the request failed
+            max_date (Optional[str]): max 'date' stored in MongoDB, None if nothing is stored yet
+
+        Raises:
+            Exception: the request of the symbol failed
+
+        Returns:
+            List[Dict[str, Any]]: prices to be added
+        """
+        if isinstance(response_data, Exception):
+            raise response_data
+
+        # FMP returns an empty object when there is no price in the requested date range
+        historical_prices: List[Dict[str, Any]] = response_data.get("historical", [])
+
+        new_prices = [item for item in historical_prices if max_date is None or max_date < item["date"]]
+        for item in new_prices:
+            item[self.symbol_key] = symbol
+
+        return new_prices
+
+    def save_prices_to_mongo(self, symbol: str, new_prices: List[Dict[str, Any]]) -> None:
+        """upsert the new prices of a symbol into its MongoDB price collection
+
+        Args:
+            symbol (str): unique symbol defining the asset
+            new_prices (List[Dict[str, Any]]): prices to be added
+        """
+        if not new_prices:
+            print(f"Skip saving data as there is no new {self.asset_type} to add for {symbol}")
+            return
+
+        saver = MongoSaver({
+            "database_name": self.config["price_database_name"],
+            "collection_name": self.get_price_collection_name(symbol),
+        })
+        # upsert on (symbol, date), a retry after a partial write doesn't duplicate prices
+        saver.upsert_data(new_prices, key_fields=[self.symbol_key, "date"])
+
+    def ingest_prices(self, symbols: List[str], concurrency_limit: Optional[int] = None) -> Dict[str, int]:
+        """fetch the new daily prices of a batch of symbols concurrently and upsert them into MongoDB,
+        then move the ingested watermarks forward
+
+        Args:
+            symbols (List[str]): unique symbols defining the assets
+            concurrency_limit (Optional[int], optional): max number of API requests in flight. Defaults to the config 'concurrency_limit'.
+
+        Raises:
+            ValueError: some symbols failed, raised after the other symbols are done
+
+        Returns:
+            Dict[str, int]: number of ingested prices keyed by symbol
+        """
+        print(f"Start ingesting {len(symbols)} {self.asset_type} prices: {symbols}")
+        errors: Dict[str, Exception] = {}
+
+        existing_symbols = self.list_loader.find_existing_values("symbol", symbols)
+        for symbol in symbols:
+            if symbol not in existing_symbols:
+                errors[symbol] = ValueError(
+                    f"'{symbol}' is not founded in the {self.config['list_database_name']}/{self.config['list_collection_name']}"
+                )
+        valid_symbols = [symbol for symbol in symbols if symbol not in errors]
+
+        ingested_counts: Dict[str, int] = {}
+
+        with PostgresManager() as postgre_manager:
+            max_dates = self.get_ingested_max_dates(postgre_manager.cursor, valid_symbols)
+
+            # only request the dates after the stored high-water mark, full history on first load
+            symbol_parameters = {symbol: {"from": get_next_date(max_date)} for symbol, max_date in max_dates.items()}
+            response_data = self.price_api_loader.fetch_data_for_symbols(
+                valid_symbols, concurrency_limit or self.config["concurrency_limit"], symbol_parameters
+            )
+
+            for symbol in valid_symbols:
+                try:
+                    new_prices = self.prepare_new_prices(symbol, response_data[symbol], max_dates.get(symbol))
+                    self.save_prices_to_mongo(symbol, new_prices)
+
+                    # only moved after the prices are saved, a failed symbol is retried from the previous watermark
+                    latest_date = max((item["date"] for item in new_prices), default=max_dates.get(symbol))
+                    if latest_date is not None:
+                        WatermarkManager.update_watermark(
+                            postgre_manager.cursor, self.asset_type, symbol, WatermarkManager.ingested_stage, latest_date
+                        )
+                        postgre_manager.commit()
+
+                    ingested_counts[symbol] = len(new_prices)
+                except Exception as error:
+                    print(f"Error: failed to ingest {self.asset_type} prices of '{symbol}', {error}")
+                    postgre_manager.conn.rollback()
+                    errors[symbol] = error
+
+        print(f"Finish ingesting {self.asset_type} prices: {ingested_counts}")
+        self._raise_for_failed_symbols("ingest", symbols, errors)
+
+        return ingested_counts
+
+    def get_asset_infos(self, symbols: List[str]) -> Dict[str, Dict[str, Any] | Exception]:
+        """get the asset info of a batch of symbols from the MongoDB symbol list, with one query
+
+        Args:
+            symbols (List[str]): unique symbols defining the assets
+
+        Returns:
+            Dict[str, Dict[str, Any] | Exception]: asset info keyed by symbol,
+                                                   or a ValueError when the symbol is missing or listed multiple times
+        """
+        found_asset_infos: Dict[str, List[Dict[str, Any]]] = {}
+        for item in self.list_loader.iter_data({"symbol": {"$in": list(symbols)}}, {"_id": 0}):
+            found_asset_infos.setdefault(item["symbol"], []).append(item)
+
+        list_name = f"'{self.config['list_database_name']}'/ '{self.config['list_collection_name']}'"
+        asset_infos = {}
+        for symbol in symbols:
+            symbol_asset_infos = found_asset_infos.get(symbol, [])
+            if len(symbol_asset_infos) == 0:
+                asset_infos[symbol] = ValueError(f"'{symbol}' doesn't exist in the MongoDB {list_name}. Please Check ")
+            elif len(symbol_asset_infos) > 1:
+                asset_infos[symbol] = ValueError(
+                    f"'{symbol}' has multiple value in {list_name}, instead it should have one value only. Please Check "
+                )
+            else:
+                asset_infos[symbol] = symbol_asset_infos[0]
+
+        return asset_infos
+
+    def upsert_asset(self, cursor: psycopg2.extensions.cursor, symbol: str, asset_info: Dict[str, Any]) -> int:
+        """insert the asset into postgres asset table, or update it when the symbol exists already
+
+        Args:
+            cursor (psycopg2.extensions.cursor): postgres database cursor
+            symbol (str): unique symbol defining the asset
+            asset_info (Dict[str, Any]): asset info from the symbol list
+
+        Returns:
+            int: asset_id for this symbol in postgresql asset table
+        """
+        asset_values = {column: asset_info[field] for column, field in self.config["asset_info_fields"].items()}
+        asset_values.update(self.config["asset_info_constants"])
+        columns = ["symbol"] + list(asset_values)
+
+        cursor.execute(
+            sql.SQL("INSERT INTO asset ({}) VALUES ({}) ON CONFLICT (symbol) DO UPDATE SET {} RETURNING asset_id").format(
+                sql.SQL(", ").join(map(sql.Identifier, columns)),
+                sql.SQL(", ").join(sql.Placeholder() * len(columns)),
+                sql.SQL(", ").join(
+                    sql.SQL("{} = EXCLUDED.{}").format(sql.Identifier(column), sql.Identifier(column))
+                    for column in asset_values
+                ),
+            ),
+            [symbol] + list(asset_values.values()),
+        )
+        asset_id = cursor.fetchone()[0]
+        print(f"Asset '{symbol}' upserted with asset_id: {asset_id}")
+
+        return asset_id
+
+    def get_standardized_max_date(self, cursor: psycopg2.extensions.cursor, symbol: str) -> Optional[str]:
+        """get the latest date of a symbol in the postgres price table, used when it has no standardized watermark yet
+
+        Args:
+            cursor (psycopg2.extensions.cursor): postgres database cursor
+            symbol (str): unique symbol defining the asset
+
+        Returns:
+            Optional[str]: max date in 'YYYY-MM-DD', None if the symbol has no price yet
+        """
+        # served from the (symbol, date) index
+        cursor.execute(
+            sql.SQL("SELECT MAX(date) FROM {} WHERE symbol = %s").format(sql.Identifier(self.price_table_name)),
+            (symbol,),
+        )
+        max_date = cursor.fetchone()[0]
+
+        return max_date.strftime("%Y-%m-%d") if max_date is not None else None
+
+    def iter_new_mongo_prices(self, symbol: str, max_date: Optional[str]) -> Iterator[Dict[str, Any]]:
+        """stream the prices of a symbol after max_date from MongoDB, in date order
+
+        Args:
+            symbol (str): unique symbol defining the asset
+            max_date (Optional[str]): max date already standardized, None to stream the entire history
+
+        Returns:
+            Iterator[Dict[str, Any]]: lazy iterator over the prices to be added
+        """
+        self.price_loader.collection_name = self.get_price_collection_name(symbol)
+
+        # without the mongodb '_id'
+        price_projection = {"_id": 0}
+        price_sort = [("date", ASCENDING)]
+
+        if max_date is None:
+            print(f"No {self.asset_type} prices of '{symbol}' in PostgreSQL, inserting its entire history from MongoDB")
+            return self.price_loader.iter_data(projection=price_projection, sort=price_sort)
+
+        print(f"PostgreSQL {self.asset_type} '{symbol}' max_date = {max_date}")
+        return self.price_loader.iter_collection_by_date(
+            "date", max_date, ">", projection=price_projection, sort=price_sort
+        )
+
+    def upsert_prices(self,
+                      cursor: psycopg2.extensions.cursor,
+                      symbol: str,
+                      asset_info: Dict[str, Any],
+                      asset_id: int,
+                      prices: Iterable[Dict[str, Any]]) -> Optional[str]:
+        """bulk upsert prices into the postgres price table on (symbol, date), then move the standardized watermark forward
+        in the same transaction
+
+        Args:
+            cursor (psycopg2.extensions.cursor): postgres database cursor
+            symbol (str): unique symbol defining the asset
+            asset_info (Dict[str, Any]): asset info from the symbol list
+            asset_id (int): asset_id for this symbol in asset table
+            prices (Iterable[Dict[str, Any]]): prices to be added, can be a lazy iterator
+
+        Returns:
+            Optional[str]: last added date, None if there was nothing to add
+        """
+        as_of_date = asset_info["date"]
+        columns = ["asset_id", "symbol"] + list(PRICE_COLUMN_FIELDS) + ["as_of_date"]
+        added_dates = {"first": None, "last": None}
+
+        def iter_rows() -> Iterator[tuple]:
+            for item in prices:
+                # only keep the first and last date for logging
+                added_dates["first"] = added_dates["first"] or item["date"]
+                added_dates["last"] = item["date"]
+
+                yield (asset_id, item[self.symbol_key], *(item[field] for field in PRICE_COLUMN_FIELDS.values()), as_of_date)
+
+        added_count = PostgresManager.upsert_rows(
+            cursor, self.price_table_name, columns, iter_rows(), conflict_columns=("symbol", "date")
+        )
+
+        if added_dates["last"] is None:
+            print(f"No new {self.asset_type} prices of '{symbol}' need to be added")
+            return None
+
+        WatermarkManager.update_watermark(
+            cursor, self.asset_type, symbol, WatermarkManager.standardized_stage, added_dates["last"]
+        )
+        print(
+            f"Upserted {added_count} {self.asset_type} prices of '{symbol}' from MongoDB to PostgreSQL, "
+            f"dates from {added_dates['first']} to {added_dates['last']}"
+        )
+
+        return added_dates["last"]
+
+    def standardize_symbol(self,
+                           cursor: psycopg2.extensions.cursor,
+                           symbol: str,
+                           asset_info: Dict[str, Any] | Exception,
+                           max_date: Optional[str],
+                           new_prices: Optional[Iterable[Dict[str, Any]]] = None) -> Optional[str]:
+        """upsert the asset and its prices after max_date into PostgreSQL, without committing
+
+        Args:
+            cursor (psycopg2.extensions.cursor): postgres database cursor
+            symbol (str): unique symbol defining the asset
+            asset_info (Dict[str, Any] | Exception): asset info from the symbol list, or the error when it can't be found
+            max_date (Optional[str]): max date already standardized, None if the symbol has no price yet
+            new_prices (Optional[Iterable[Dict[str, Any]]], optional): prices after max_date in date order. Defaults to None, read from MongoDB.
+
+        Raises:
+            ValueError: the asset info can't be found
+
+        Returns:
+            Optional[str]: last added date, None if there was nothing to add
+        """
+        if isinstance(asset_info, Exception):
+            raise asset_info
+
+        asset_id = self.upsert_asset(cursor, symbol, asset_info)
+
+        if new_prices is None:
+            new_prices = self.iter_new_mongo_prices(symbol, max_date)
+
+        last_added_date = self.upsert_prices(cursor, symbol, asset_info, asset_id, new_prices)
+        if last_added_date is None and max_date is not None:
+            # seed the watermark found by scanning, the next runs don't need to scan
+            WatermarkManager.update_watermark(
+                cursor, self.asset_type, symbol, WatermarkManager.standardized_stage, max_date
+            )
+
+        return last_added_date
+
+    def standardize_prices(self, symbols: List[str]) -> Dict[str, Optional[str]]:
+        """load the asset info and new prices of a batch of symbols from MongoDB into PostgreSQL,
+        each symbol is committed on its own, on one pooled connection shared by the batch
+
+        Args:
+            symbols (List[str]): unique symbols defining the assets
+
+        Raises:
+            ValueError: some symbols failed, raised after the other symbols are done
+
+        Returns:
+            Dict[str, Optional[str]]: last added date keyed by symbol, None if there was nothing to add
+        """
+        print(f"Start standardizing {len(symbols)} {self.asset_type} prices: {symbols}")
+        errors: Dict[str, Exception] = {}
+        standardized_dates: Dict[str, Optional[str]] = {}
+
+        asset_infos = self.get_asset_infos(symbols)
+
+        # the yearly partitions the rows are routed to must exist before loading
+        PostgresManager.ensure_partitions(self.price_table_name)
+
+        with PostgresManager() as postgre_manager:
+            cursor = postgre_manager.cursor
+            max_dates = WatermarkManager.get_watermarks(cursor, self.asset_type, symbols, WatermarkManager.standardized_stage)
+
+            for symbol in symbols:
+                try:
+                    max_date = max_dates.get(symbol) or self.get_standardized_max_date(cursor, symbol)
+                    standardized_dates[symbol] = self.standardize_symbol(cursor, symbol, asset_infos[symbol], max_date)
+
+                    postgre_manager.commit()
+                except Exception as error:
+                    print(f"Error: failed to standardize {self.asset_type} prices of '{symbol}', {error}")
+                    postgre_manager.conn.rollback()
+                    errors[symbol] = error
+
+        print(f"Finish standardizing {self.asset_type} prices: {standardized_dates}")
+        self._raise_for_failed_symbols("standardize", symbols, errors)
+
+        return standardized_dates
+
+    def ingest_and_standardize_prices(self, symbols: List[str], concurrency_limit: Optional[int] = None) -> Dict[str, int]:
+        """fused ingest and standardize: fetch the new daily prices of a batch of symbols, upsert them into MongoDB,
+        then load the same in-memory prices into PostgreSQL, without reading them back from MongoDB.
+
+        A symbol whose PostgreSQL prices are behind its MongoDB prices (eg. a previous standardize failed)
+        catches up by reading the missing prices from MongoDB, like standardize_prices.
+        The asset, prices and both watermarks of a symbol are committed together, after its MongoDB write
+
+        Args:
+            symbols (List[str]): unique symbols defining the assets
+            concurrency_limit (Optional[int], optional): max number of API requests in flight. Defaults to the config 'concurrency_limit'.
+
+        Raises:
+            ValueError: some symbols failed, raised after the other symbols are done
+
+        Returns:
+            Dict[str, int]: number of ingested prices keyed by symbol
+        """
+        print(f"Start ingesting and standardizing {len(symbols)} {self.asset_type} prices: {symbols}")
+        errors: Dict[str, Exception] = {}
+
+        # the symbol list lookup validates the symbols as well
+        asset_infos = self.get_asset_infos(symbols)
+        valid_symbols = [symbol for symbol in symbols if not isinstance(asset_infos[symbol], Exception)]
+        errors.update({symbol: asset_infos[symbol] for symbol in symbols if symbol not in valid_symbols})
+
+        PostgresManager.ensure_partitions(self.price_table_name)
+
+        ingested_counts: Dict[str, int] = {}
+
+        with PostgresManager() as postgre_manager:
+            cursor = postgre_manager.cursor
+            ingested_max_dates = self.get_ingested_max_dates(cursor, valid_symbols)
+            standardized_max_dates = WatermarkManager.get_watermarks(
+                cursor, self.asset_type, valid_symbols, WatermarkManager.standardized_stage
+            )
+
+            symbol_parameters = {
+                symbol: {"from": get_next_date(max_date)} for symbol, max_date in ingested_max_dates.items()
+            }
+            response_data = self.price_api_loader.fetch_data_for_symbols(
+                valid_symbols, concurrency_limit or self.config["concurrency_limit"], symbol_parameters
+            )
+
+            for symbol in valid_symbols:
+                try:
+                    ingested_max_date = ingested_max_dates.get(symbol)
+                    new_prices = self.prepare_new_prices(symbol, response_data[symbol], ingested_max_date)
+                    self.save_prices_to_mongo(symbol, new_prices)
+
+                    standardized_max_date = (
+                        standardized_max_dates.get(symbol) or self.get_standardized_max_date(cursor, symbol)
+                    )
+                    if standardized_max_date == ingested_max_date:
+                        # PostgreSQL is up to date with MongoDB, the fetched prices are exactly what is missing
+                        self.standardize_symbol(cursor, symbol, asset_infos[symbol], standardized_max_date,
+                                                sorted(new_prices, key=lambda item: item["date"]))
+                    else:
+                        print(f"PostgreSQL {self.asset_type} '{symbol}' is behind MongoDB, catch up from MongoDB")
+                        self.standardize_symbol(cursor, symbol, asset_infos[symbol], standardized_max_date)
+
+                    latest_date = max((item["date"] for item in new_prices), default=ingested_max_date)
+                    if latest_date is not None:
+                        WatermarkManager.update_watermark(
+                            cursor, self.asset_type, symbol, WatermarkManager.ingested_stage, latest_date
+                        )
+
+                    postgre_manager.commit()
+                    ingested_counts[symbol] = len(new_prices)
+                except Exception as error:
+                    print(f"Error: failed to ingest and standardize {self.asset_type} prices of '{symbol}', {error}")
+                    postgre_manager.conn.rollback()
+                    errors[symbol] = error
+
+        print(f"Finish ingesting and standardizing {self.asset_type} prices: {ingested_counts}")
+        self._raise_for_failed_symbols("ingest and standardize", symbols, errors)
+
+        return ingested_counts
+
+    def backfill_prices(self, symbol: str, from_date: str, to_date: str) -> int:
+        """fetch the prices of a symbol within [from_date, to_date] and store them into MongoDB and PostgreSQL,
+        used by the backfill work units, whatever the watermarks are. Both stores are upserted on (symbol, date),
+        so a window can be backfilled again safely
+
+        Args:
+            symbol (str): unique symbol defining the asset
+            from_date (str): first date of the window, 'YYYY-MM-DD'
+            to_date (str): last date of the window, 'YYYY-MM-DD'
+
+        Raises:
+            Exception: the request, the asset info lookup or a write failed
+
+        Returns:
+            int: number of backfilled prices
+        """
+        response_data = self.price_api_loader.fetch_data_for_symbols(
+            [symbol], 1, {symbol: {"from": from_date, "to": to_date}}
+        )
+        new_prices = [
+            item for item in self.prepare_new_prices(symbol, response_data[symbol], None)
+            if from_date <= item["date"] <= to_date
+        ]
+        self.save_prices_to_mongo(symbol, new_prices)
+
+        with PostgresManager() as postgre_manager:
+            cursor = postgre_manager.cursor
+            asset_info = self.get_asset_infos([symbol])[symbol]
+            self.standardize_symbol(cursor, symbol, asset_info, None, sorted(new_prices, key=lambda item: item["date"]))
+
+            if new_prices:
+                # watermarks only move forward, an older window leaves them unchanged
+                WatermarkManager.update_watermark(
+                    cursor, self.asset_type, symbol, WatermarkManager.ingested_stage,
+                    max(item["date"] for item in new_prices)
+                )
+
+            postgre_manager.commit()
+
+        return len(new_prices)
@@ -0,0 +1,242 @@
+import os
+import json
+import argparse
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import List, Dict, Any, Optional, Set
+
+from InvestmentAsCode_AssetFlowPlatform.data_processing.managers.postgres_manager import (
+    PostgresManager,
+)
+from InvestmentAsCode_AssetFlowPlatform.jobs.asset_pipeline.asset_pipeline_config import (
+    ASSET_PIPELINE_CONFIGS,
+)
+from InvestmentAsCode_AssetFlowPlatform.jobs.asset_pipeline.asset_pipeline_engine import (
+    AssetPipelineEngine,
+)
+from InvestmentAsCode_AssetFlowPlatform.jobs.asset_pipeline.symbol_universe import (
+    get_symbol_universe,
+)
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+date_format = "%Y-%m-%d"
+
+# engine of each asset type, created once per worker process
+_worker_engines: Dict[str, AssetPipelineEngine] = {}
+
+
+def build_work_units(asset_type: str, symbols: List[str], from_date: str, to_date: str, window_days: int = 365) -> List[Dict[str, str]]:
+    """split symbols x [from_date, to_date] into work units of one symbol and one date window
+
+    Args:
+        asset_type (str): 'stock' or 'crypto'
+        symbols (List[str]): unique symbols defining the assets
+        from_date (str): first date to backfill, 'YYYY-MM-DD'
+        to_date (str): last date to backfill, 'YYYY-MM-DD'
+        window_days (int, optional): number of days per work unit. Defaults to 365.
+
+    Raises:
+        ValueError: window_days is not positive, or from_date is after to_date
+
+    Returns:
+        List[Dict[str, str]]: work units, with 'asset_type', 'symbol', 'from_date' and 'to_date'
+    """
+    if window_days < 1:
+        raise ValueError(f"window_days should be at least 1, instead it's {window_days}")
+
+    start_date = datetime.strptime(from_date, date_format)
+    end_date = datetime.strptime(to_date, date_format)
+    if start_date > end_date:
+        raise ValueError(f"from_date {from_date} is after to_date {to_date}")
+
+    windows = []
+    window_start = start_date
+    while window_start <= end_date:
+        window_end = min(window_start + timedelta(days=window_days - 1), end_date)
+        windows.append((window_start.strftime(date_format), window_end.strftime(date_format)))
+        window_start = window_end + timedelta(days=1)
+
+    return [
+        {"asset_type": asset_type, "symbol": symbol, "from_date": window_from, "to_date": window_to}
+        for symbol in symbols
+        for window_from, window_to in windows
+    ]
+
+
+def get_work_unit_key(work_unit: Dict[str, str]) -> str:
+    return f"{work_unit['asset_type']}:{work_unit['symbol']}:{work_unit['from_date']}:{work_unit['to_date']}"
+
+
+def read_checkpoint(checkpoint_file: str) -> Set[str]:
+    """read the keys of the work units completed by previous runs
+
+    Args:
+        checkpoint_file (str): path of the JSON lines checkpoint file
+
+    Returns:
+        Set[str]: completed work unit keys, empty if the file doesn't exist yet
+    """
+    if not os.path.exists(checkpoint_file):
+        return set()
+
+    completed_keys = set()
+    with open(checkpoint_file, "r") as checkpoint:
+        for line in checkpoint:
+            try:
+                completed_keys.add(json.loads(line)["key"])
+            except (json.JSONDecodeError, KeyError):
+                # the last line may be cut by an interruption
+                continue
+
+    return completed_keys
+
+
+def write_checkpoint(checkpoint_file: str, work_unit: Dict[str, str], backfilled_count: int) -> None:
+    """append a completed work unit to the checkpoint file, flushed to disk before returning
+
+    Args:
+        checkpoint_file (str): path of the JSON lines checkpoint file
+        work_unit (Dict[str, str]): completed work unit
+        backfilled_count (int): number of backfilled prices
+    """
+    # an interrupted previous run may have left a cut last line, start a new line instead of appending to it
+    is_last_line_cut = False
+    if os.path.exists(checkpoint_file) and os.path.getsize(checkpoint_file) > 0:
+        with open(checkpoint_file, "rb") as checkpoint:
+            checkpoint.seek(-1, os.SEEK_END)
+            is_last_line_cut = checkpoint.read(1) != b"\n"
+
+    with open(checkpoint_file, "a") as checkpoint:
+        if is_last_line_cut:
+            checkpoint.write("\n")
+        checkpoint.write(json.dumps({
+            "key": get_work_unit_key(work_unit),
+            **work_unit,
+            "count": backfilled_count,
+            "completed_at": datetime.now().isoformat(),
+        }) + "\n")
+        checkpoint.flush()
+        os.fsync(checkpoint.fileno())
+
+
+def run_work_unit(work_unit: Dict[str, str]) -> int:
+    """backfill one work unit, run in a worker process
+
+    Args:
+        work_unit (Dict[str, str]): work unit, see build_work_units
+
+    Returns:
+        int: number of backfilled prices
+    """
+    asset_type = work_unit["asset_type"]
+    if asset_type not in _worker_engines:
+        _worker_engines[asset_type] = AssetPipelineEngine.from_asset_type(asset_type)
+
+    return _worker_engines[asset_type].backfill_prices(work_unit["symbol"], work_unit["from_date"], work_unit["to_date"])
+
+
+def backfill(asset_type: str,
+             symbols: List[str],
+             from_date: str,
+             to_date: str,
+             checkpoint_file: str,
+             window_days: int = 365,
+             max_workers: int = 4) -> Dict[str, int]:
+    """backfill the prices of symbols within [from_date, to_date] into MongoDB and PostgreSQL,
+    work units (one symbol, one date window) are run on a process pool with at most max_workers in parallel.
+
+    Completed work units are appended to checkpoint_file and skipped when the backfill is run again,
+    so an interrupted backfill resumes where it stopped. A failed work unit doesn't stop the others
+
+    Args:
+        asset_type (str): 'stock' or 'crypto'
+        symbols (List[str]): unique symbols defining the assets
+        from_date (str): first date to backfill, 'YYYY-MM-DD'
+        to_date (str): last date to backfill, 'YYYY-MM-DD'
+        checkpoint_file (str): path of the JSON lines checkpoint file
+        window_days (int, optional): number of days per work unit. Defaults to 365.
+        max_workers (int, optional): number of worker processes. Defaults to 4.
+
+    Raises:
+        ValueError: some work units failed, raised after the others are done
+
+    Returns:
+        Dict[str, int]: number of backfilled prices keyed by work unit key
+    """
+    work_units = build_work_units(asset_type, symbols, from_date, to_date, window_days)
+    completed_keys = read_checkpoint(checkpoint_file)
+    pending_work_units = [work_unit for work_unit in work_units if get_work_unit_key(work_unit) not in completed_keys]
+    print(f"Backfill {asset_type} {len(symbols)} symbols from {from_date} to {to_date}: "
+          f"{len(pending_work_units)} / {len(work_units)} work units to run, {max_workers} workers")
+
+    # partitions are created once here, instead of racing in the workers
+    PostgresManager.ensure_partitions(ASSET_PIPELINE_CONFIGS[asset_type]["price_table_name"])
+    # connections must not be shared with the worker processes
+    PostgresManager.close_pool()
+
+    backfilled_counts: Dict[str, int] = {}
+    errors: Dict[str, Exception] = {}
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        in_flight: Dict[Future, Dict[str, str]] = {}
+
+        def collect_finished(finished: Set[Future]) -> None:
+            for future in finished:
+                work_unit = in_flight.pop(future)
+                work_unit_key = get_work_unit_key(work_unit)
+                try:
+                    backfilled_counts[work_unit_key] = future.result()
+                except Exception as error:
+                    print(f"Error: failed to backfill {work_unit_key}, {error}")
+                    errors[work_unit_key] = error
+                    continue
+
+                write_checkpoint(checkpoint_file, work_unit, backfilled_counts[work_unit_key])
+                print(f"Backfilled {work_unit_key}: {backfilled_counts[work_unit_key]} prices "
+                      f"({len(backfilled_counts) + len(errors)} / {len(pending_work_units)})")
+
+        # submit lazily, so the queue of pending work units stays bounded
+        for work_unit in pending_work_units:
+            if len(in_flight) >= max_workers * 2:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect_finished(finished)
+            in_flight[executor.submit(run_work_unit, work_unit)] = work_unit
+
+        finished, _ = wait(in_flight)
+        collect_finished(finished)
+
+    print(f"Finish backfill: {sum(backfilled_counts.values())} prices in {len(backfilled_counts)} work units, {len(errors)} failed")
+    if errors:
+        error_messages = "; ".join(f"'{work_unit_key}': {error}" for work_unit_key, error in errors.items())
+        raise ValueError(f"Failed to backfill {len(errors)} work units, run the backfill again to retry them. {error_messages}")
+
+    return backfilled_counts
+
+
+def main(arguments: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Backfill historical prices into MongoDB and PostgreSQL")
+    parser.add_argument("--asset-type", required=True, choices=list(ASSET_PIPELINE_CONFIGS))
+    parser.add_argument("--symbols", nargs="*", help="symbols to backfill, defaults to the symbol universe of the asset type")
+    parser.add_argument("--from-date", required=True, help="first date to backfill, YYYY-MM-DD")
+    parser.add_argument("--to-date", default=datetime.now().strftime(date_format), help="last date to backfill, YYYY-MM-DD, defaults to today")
+    parser.add_argument("--window-days", type=int, default=365, help="number of days per work unit")
+    parser.add_argument("--max-workers", type=int, default=4, help="number of worker processes")
+    parser.add_argument("--checkpoint-file", help="JSON lines file of completed work units, defaults to backfill_<asset type>.checkpoint.jsonl")
+    parsed_arguments = parser.parse_args(arguments)
+
+    backfill(
+        parsed_arguments.asset_type,
+        parsed_arguments.symbols or get_symbol_universe(parsed_arguments.asset_type),
+        parsed_arguments.from_date,
+        parsed_arguments.to_date,
+        parsed_arguments.checkpoint_file or f"backfill_{parsed_arguments.asset_type}.checkpoint.jsonl",
+        parsed_arguments.window_days,
+        parsed_arguments.max_workers,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+from typing import List, Dict, Any
+
+from InvestmentAsCode_AssetFlowPlatform.data_processing.loaders.mongo_loader import (
+    MongoLoader,
+)
+from InvestmentAsCode_AssetFlowPlatform.data_processing.managers.mongo_manager import (
+    MongoDBManager,
+)
+from InvestmentAsCode_AssetFlowPlatform.jobs.asset_pipeline.asset_pipeline_config import (
+    ASSET_PIPELINE_CONFIGS,
+)
+
+# symbols processed by the price pipelines, one document per symbol:
+# {"asset_type": "stock", "symbol": "AAPL", "enabled": true}
+universe_database_name = "ingestion-general_info"
+universe_collection_name = "pipeline_universe"
+
+
+def get_symbol_universe(asset_type: str) -> List[str]:
+    """get the enabled symbols of an asset type from the MongoDB 'ingestion-general_info/pipeline_universe',
+    falling back to the config 'default_symbols' when there is none
+
+    Args:
+        asset_type (str): 'stock' or 'crypto'
+
+    Returns:
+        List[str]: symbols to be processed, sorted
+    """
+    universe_loader = MongoLoader(
+        {"database_name": universe_database_name, "collection_name": universe_collection_name}
+    )
+
+    symbols = []
+    if MongoDBManager.check_collection_exists(universe_loader.client, universe_database_name, universe_collection_name):
+        symbols = [
+            item["symbol"]
+            for item in universe_loader.iter_data(
+                {"asset_type": asset_type, "enabled": {"$ne": False}}, {"symbol": 1, "_id": 0}
+            )
+        ]
+
+    if not symbols:
+        symbols = ASSET_PIPELINE_CONFIGS[asset_type]["default_symbols"]
+        print(f"No {asset_type} symbols in {universe_database_name}/{universe_collection_name}, use default symbols {symbols}")
+
+    return sorted(set(symbols))
+
+
+def split_into_shards(symbols: List[str], shard_count: int) -> List[List[str]]:
+    """split symbols into at most shard_count shards of (nearly) equal size, empty shards are left out
+
+    Args:
+        symbols (List[str]): symbols to be processed
+        shard_count (int): number of shards
+
+    Raises:
+        ValueError: shard_count is not positive
+
+    Returns:
+        List[List[str]]: symbols of each shard
+    """
+    if shard_count < 1:
+        raise ValueError(f"shard_count should be at least 1, instead it's {shard_count}")
+
+    shards = [symbols[shard_index::shard_count] for shard_index in range(shard_count)]
+    return [shard for shard in shards if shard]
+
+
+def build_shard_kwargs(asset_type: str, shard_count: int) -> List[Dict[str, Any]]:
+    """read the symbol universe of an asset type and build the keyword arguments of each shard's batch task,
+    used to map the Airflow batch tasks over the shards
+
+    Args:
+        asset_type (str): 'stock' or 'crypto'
+        shard_count (int): number of shards
+
+    Returns:
+        List[Dict[str, Any]]: eg. [{"stock_symbols": ["AAPL", "TSLA"]}, {"stock_symbols": ["NVDA"]}]
+    """
+    symbols = get_symbol_universe(asset_type)
+    shards = split_into_shards(symbols, shard_count)
+    print(f"Split {len(symbols)} {asset_type} symbols into {len(shards)} shards")
+
+    return [{f"{asset_type}_symbols": shard} for shard in shards]
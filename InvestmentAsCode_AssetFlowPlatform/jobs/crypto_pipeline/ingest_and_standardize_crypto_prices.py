@@ -0,0 +1,37 @@
+from typing import List, Dict
+
+from InvestmentAsCode_AssetFlowPlatform.jobs.asset_pipeline.asset_pipeline_engine import (
+    AssetPipelineEngine,
+)
+
+
+def airflow_batch_task(**kwargs):
+    crypto_symbols = kwargs.get("crypto_symbols")
+    batch_task(crypto_symbols)
+
+
+def task(crypto_symbol: str) -> None:
+    """Main logic to fetch 'crypto_symbol' crypto prices, write them into MongoDB and standardize them into Postgres Database
+    in one go, without reading them back from MongoDB
+
+    Args:
+        crypto_symbol (str): unique symbol defining crypto
+    """
+    batch_task([crypto_symbol])
+
+
+def batch_task(crypto_symbols: List[str]) -> Dict[str, int]:
+    """fetch the crypto prices of many crypto_symbols concurrently, write them into MongoDB and standardize them into
+    Postgres Database from the same in-memory batch, see AssetPipelineEngine.ingest_and_standardize_prices
+
+    Args:
+        crypto_symbols (List[str]): unique symbols defining cryptos
+
+    Returns:
+        Dict[str, int]: number of ingested prices keyed by crypto_symbol
+    """
+    return AssetPipelineEngine.from_asset_type("crypto").ingest_and_standardize_prices(crypto_symbols)
+
+
+if __name__ == "__main__":
+    task("BTCUSD")  # take BTCUSD as example
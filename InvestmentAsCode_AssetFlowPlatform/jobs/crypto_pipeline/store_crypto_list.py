@@ -1,6 +1,7 @@
 # Import Loaders & Savers
 from InvestmentAsCode_AssetFlowPlatform.data_processing.loaders.api_loader import ApiLoader
 from InvestmentAsCode_AssetFlowPlatform.data_processing.savers.mongo_saver import MongoSaver
+from InvestmentAsCode_AssetFlowPlatform.data_processing.pipelines.stage_pipeline import StagePipeline
 
 from InvestmentAsCode_AssetFlowPlatform.utils.common_utils import add_date_to_data
 
@@ -20,13 +21,12 @@ def task():
   }
 
   api_loader = ApiLoader(api_loader_config)
-  new_data = api_loader.fetch_data()
 
   ###########################################################
   # Transform Data
   ###########################################################
 
-  new_data_with_date = add_date_to_data(new_data)
+  transforms = [add_date_to_data]
 
   ###########################################################
   # Save Data
@@ -39,7 +39,19 @@ def task():
   }
 
   saver = MongoSaver(saver_config)
-  saver.replace_collection(new_data_with_date)
+
+  ###########################################################
+  # Run Pipeline
+  ###########################################################
+
+  # stream the list in fixed-size batches, memory stays flat regardless of the catalog size,
+  # the next batches are downloaded and transformed while the previous ones are written
+  pipeline = StagePipeline(api_loader,
+                           saver,
+                           transforms,
+                           batch_size=5000,
+                           save_batches=saver.replace_collection_in_batches)
+  pipeline.run()
 
 if __name__ == "__main__":
     task()
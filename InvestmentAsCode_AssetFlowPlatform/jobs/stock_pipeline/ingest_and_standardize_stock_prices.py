@@ -0,0 +1,37 @@
+from typing import List, Dict
+
+from InvestmentAsCode_AssetFlowPlatform.jobs.asset_pipeline.asset_pipeline_engine import (
+    AssetPipelineEngine,
+)
+
+
+def airflow_batch_task(**kwargs):
+    stock_symbols = kwargs.get("stock_symbols")
+    batch_task(stock_symbols)
+
+
+def task(stock_symbol: str) -> None:
+    """Main logic to fetch 'stock_symbol' stock prices, write them into MongoDB and standardize them into Postgres Database
+    in one go, without reading them back from MongoDB
+
+    Args:
+        stock_symbol (str): unique symbol defining stock
+    """
+    batch_task([stock_symbol])
+
+
+def batch_task(stock_symbols: List[str]) -> Dict[str, int]:
+    """fetch the stock prices of many stock_symbols concurrently, write them into MongoDB and standardize them into
+    Postgres Database from the same in-memory batch, see AssetPipelineEngine.ingest_and_standardize_prices
+
+    Args:
+        stock_symbols (List[str]): unique symbols defining stocks
+
+    Returns:
+        Dict[str, int]: number of ingested prices keyed by stock_symbol
+    """
+    return AssetPipelineEngine.from_asset_type("stock").ingest_and_standardize_prices(stock_symbols)
+
+
+if __name__ == "__main__":
+    task("AAPL")  # take AAPL as example
@@ -1,13 +1,21 @@
 # Import Loaders & Savers
 from InvestmentAsCode_AssetFlowPlatform.data_processing.loaders.api_loader import ApiLoader
 from InvestmentAsCode_AssetFlowPlatform.data_processing.savers.mongo_saver import MongoSaver
+from InvestmentAsCode_AssetFlowPlatform.data_processing.pipelines.stage_pipeline import StagePipeline
 
 from InvestmentAsCode_AssetFlowPlatform.utils.common_utils import add_date_to_data
+from typing import Any, Dict, List
 
 import os
 os.environ["no_proxy"] = "*"
 
 
+def validate_data(data: List[Any]) -> List[Dict[str, Any]]:
+    if not all(isinstance(item, dict) for item in data):
+        raise ValueError("The API response must be a list of dictionaries, Please Check.")
+    return data
+
+
 def task():
 
     ###########################################################
@@ -22,17 +30,12 @@ def task():
     }
 
     api_loader = ApiLoader(api_loader_config)
-    new_data = api_loader.fetch_data()
 
     ###########################################################
     # Transform Data/
     ###########################################################
-    if not isinstance(new_data, list) or not all(
-        isinstance(item, dict) for item in new_data
-    ):
-        raise ValueError(f"The 'new_data' variable must be a list of dictionaries, Please Check.")
-
-    new_data_with_date = add_date_to_data(new_data)
+    # a response which is not a JSON array is rejected while parsing
+    transforms = [validate_data, add_date_to_data]
 
     ###########################################################
     # Save Data
@@ -45,7 +48,17 @@ def task():
     }
 
     saver = MongoSaver(saver_config)
-    saver.replace_collection(new_data_with_date)
+
+    ###########################################################
+    # Run Pipeline
+    ###########################################################
+
+    pipeline = StagePipeline(api_loader,
+                             saver,
+                             transforms,
+                             batch_size=5000,
+                             save_batches=saver.replace_collection_in_batches)
+    pipeline.run()
 
 
 if __name__ == "__main__":
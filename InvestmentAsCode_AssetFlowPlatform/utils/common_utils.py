@@ -1,5 +1,9 @@
-from typing import List, Dict, Any
-from datetime import date
+import re
+import json
+import codecs
+from itertools import islice
+from typing import List, Dict, Any, Iterable, Iterator
+from datetime import date, datetime, timedelta
 
 def add_date_to_data(data: List[Dict[str, Any]]):
     today = date.today().strftime("%Y-%m-%d")
@@ -16,3 +20,96 @@ def find_min_max_dates(data: List[Dict[str, Any]], date_key: str):
     return min_date, max_date
   else:
       raise ValueError(f"No '{date_key}' found in the list.")
+
+def get_next_date(date_string: str) -> str:
+  next_date = datetime.strptime(date_string, "%Y-%m-%d") + timedelta(days=1)
+  return next_date.strftime("%Y-%m-%d")
+
+def split_into_chunks(items: Iterable[Any], chunk_size: int) -> Iterator[List[Any]]:
+  iterator = iter(items)
+  while True:
+    chunk = list(islice(iterator, chunk_size))
+    if not chunk:
+      return
+    yield chunk
+
+_JSON_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# characters which may follow an item of a JSON array
+_JSON_DELIMITERS = frozenset(",] \t\n\r")
+
+def iter_json_array_items(chunks: Iterable[bytes]) -> Iterator[Any]:
+  """parse a top-level JSON array incrementally from raw byte chunks, yield each item once it is complete
+
+  Args:
+      chunks (Iterable[bytes]): raw UTF-8 chunks of the JSON document, eg. response.iter_content()
+
+  Raises:
+      ValueError: the document is not a JSON array, is malformed, or it ends before the array is closed
+
+  Yields:
+      Iterator[Any]: decoded array items
+  """
+  json_decoder = json.JSONDecoder()
+  text_decoder = codecs.getincrementaldecoder("utf-8")()
+  buffer = ""
+  is_array_started = False
+  is_array_closed = False
+  # what may come next inside the array: "first" item or ']', an "item" after ',', a "separator" ',' or ']' after an item
+  expected = "first"
+
+  def iter_end_marker():
+    yield from chunks
+    yield None
+
+  for chunk in iter_end_marker():
+    is_final = chunk is None
+    buffer += text_decoder.decode(b"" if is_final else chunk, final=is_final)
+    position = 0
+
+    while True:
+      position = _JSON_WHITESPACE.match(buffer, position).end()
+      if position >= len(buffer):
+        break
+
+      if is_array_closed:
+        raise ValueError(f"Unexpected data after the JSON array: {buffer[position:position + 200]}")
+      elif not is_array_started:
+        if buffer[position] != "[":
+          raise ValueError(f"Expected a JSON array, instead got: {buffer[position:position + 200]}")
+        is_array_started = True
+        position += 1
+      elif buffer[position] == "]":
+        if expected == "item":
+          raise ValueError(f"Unexpected ']' after ',' in the JSON array: {buffer[max(position - 200, 0):position + 1]}")
+        # keep consuming the remaining chunks, so the chunk source (eg. a cache writer) completes
+        is_array_closed = True
+        position += 1
+      elif buffer[position] == ",":
+        if expected != "separator":
+          raise ValueError(f"Unexpected ',' in the JSON array: {buffer[max(position - 200, 0):position + 1]}")
+        expected = "item"
+        position += 1
+      elif expected == "separator":
+        raise ValueError(f"Expected ',' or ']' between JSON array items, instead got: {buffer[position:position + 200]}")
+      else:
+        try:
+          item, end_position = json_decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+          if is_final:
+            raise
+          # item is not complete yet, wait for more chunks
+          break
+        if end_position == len(buffer) or buffer[end_position] not in _JSON_DELIMITERS:
+          if not is_final:
+            # a scalar may continue in the next chunk, eg. '189.' + '84', it is complete once followed by a delimiter
+            break
+          if end_position < len(buffer):
+            raise ValueError(f"Invalid JSON array item: {buffer[position:end_position + 200]}")
+        yield item
+        expected = "separator"
+        position = end_position
+
+    buffer = buffer[position:]
+
+  if not is_array_closed:
+    raise ValueError("JSON array ended before its closing ']'")
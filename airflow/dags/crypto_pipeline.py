@@ -1,13 +1,21 @@
+import os
 from airflow import DAG
+from airflow.models import Variable
 from airflow.operators.python_operator import PythonOperator
-from airflow.utils.task_group import TaskGroup
 from datetime import datetime
 
 from InvestmentAsCode_AssetFlowPlatform.jobs.crypto_pipeline import store_crypto_list
 from InvestmentAsCode_AssetFlowPlatform.jobs.crypto_pipeline import store_daily_crypto_prices
 from InvestmentAsCode_AssetFlowPlatform.jobs.crypto_pipeline import standardize_crypto_data
+from InvestmentAsCode_AssetFlowPlatform.jobs.crypto_pipeline import ingest_and_standardize_crypto_prices
+from InvestmentAsCode_AssetFlowPlatform.jobs.asset_pipeline import symbol_universe
 
-crypto_symbols = ["BTCUSD", "ETHUSD", "USDTUSD"]
+# number of mapped tasks per stage, the task count stays the same however many symbols there are
+shard_count_variable = "crypto_pipeline_shard_count"
+default_shard_count = 2
+
+# 'fused' ingests and standardizes each shard in one task from the same fetched batch, 'two_step' runs them as two tasks
+pipeline_mode = os.getenv("ASSET_PIPELINE_MODE", "two_step")
 
 schedule_interval = "0 17 * * *"
 
@@ -16,6 +24,13 @@ default_args = {
     "start_date": datetime(2024, 4, 7),
 }
 
+
+def plan_crypto_shards():
+    # read at run time, not when the DAG file is parsed
+    shard_count = int(Variable.get(shard_count_variable, default_var=default_shard_count))
+    return symbol_universe.build_shard_kwargs("crypto", shard_count)
+
+
 with DAG(
     "crypto_price_pipeline",
     default_args=default_args,
@@ -27,29 +42,31 @@ with DAG(
         python_callable=store_crypto_list.task,
     )
 
-    with TaskGroup("ingest_daily_crypto_prices") as ingest_daily_crypto_prices:
-        tasks = []
-        for crypto_symbol in crypto_symbols:
-            ingest_task = PythonOperator(
-                task_id=f"ingest_daily_crypto_price_{crypto_symbol}",
-                python_callable=store_daily_crypto_prices.airflow_task,
-                op_kwargs={"crypto_symbol": crypto_symbol}
-            )
-
-            standardize_task = PythonOperator(
-                task_id=f"standardize_crypto_data_{crypto_symbol}",
-                python_callable=standardize_crypto_data.airflow_task,
-                op_kwargs={"crypto_symbol": crypto_symbol}
-            )
-
-            ingest_task >> standardize_task
-
-            tasks.append(ingest_task)
-            tasks.append(standardize_task)
-
+    # the symbols come from 'ingestion-general_info/pipeline_universe', see symbol_universe.py
+    plan_shards = PythonOperator(
+        task_id="plan_crypto_shards",
+        python_callable=plan_crypto_shards,
+    )
 
-        tasks  # Add all tasks to the task group
+    # one mapped task per shard, each processing its symbols as one batch
+    if pipeline_mode == "fused":
+        ingest_and_standardize_daily_crypto_prices = PythonOperator.partial(
+            task_id="ingest_and_standardize_daily_crypto_prices",
+            python_callable=ingest_and_standardize_crypto_prices.airflow_batch_task,
+        ).expand(op_kwargs=plan_shards.output)
 
-    task_1 >> ingest_daily_crypto_prices
+        task_1 >> plan_shards >> ingest_and_standardize_daily_crypto_prices
+    else:
+        ingest_daily_crypto_prices = PythonOperator.partial(
+            task_id="ingest_daily_crypto_prices",
+            python_callable=store_daily_crypto_prices.airflow_batch_task,
+        ).expand(op_kwargs=plan_shards.output)
 
+        standardize_crypto_data_task = PythonOperator.partial(
+            task_id="standardize_crypto_data",
+            python_callable=standardize_crypto_data.airflow_batch_task,
+            # a shard failing to ingest some symbols doesn't hold back standardizing what is stored
+            trigger_rule="all_done",
+        ).expand(op_kwargs=plan_shards.output)
 
+        task_1 >> plan_shards >> ingest_daily_crypto_prices >> standardize_crypto_data_task
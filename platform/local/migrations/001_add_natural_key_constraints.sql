@@ -0,0 +1,34 @@
+-- Add the natural key unique constraints to an existing database created by an older setup_postgres.sql
+-- Duplicated rows are removed first, keeping the latest inserted one
+
+BEGIN;
+
+-- point prices to the asset row which is kept for each symbol
+UPDATE stock
+SET asset_id = kept_asset.asset_id
+FROM asset, (SELECT symbol, MAX(asset_id) AS asset_id FROM asset GROUP BY symbol) AS kept_asset
+WHERE stock.asset_id = asset.asset_id
+  AND asset.symbol = kept_asset.symbol
+  AND stock.asset_id <> kept_asset.asset_id;
+
+UPDATE crypto
+SET asset_id = kept_asset.asset_id
+FROM asset, (SELECT symbol, MAX(asset_id) AS asset_id FROM asset GROUP BY symbol) AS kept_asset
+WHERE crypto.asset_id = asset.asset_id
+  AND asset.symbol = kept_asset.symbol
+  AND crypto.asset_id <> kept_asset.asset_id;
+
+DELETE FROM asset
+WHERE asset_id NOT IN (SELECT MAX(asset_id) FROM asset GROUP BY symbol);
+
+DELETE FROM stock
+WHERE id NOT IN (SELECT MAX(id) FROM stock GROUP BY symbol, date);
+
+DELETE FROM crypto
+WHERE id NOT IN (SELECT MAX(id) FROM crypto GROUP BY symbol, date);
+
+ALTER TABLE asset ADD CONSTRAINT asset_symbol_unique UNIQUE (symbol);
+ALTER TABLE stock ADD CONSTRAINT stock_symbol_date_unique UNIQUE (symbol, date);
+ALTER TABLE crypto ADD CONSTRAINT crypto_symbol_date_unique UNIQUE (symbol, date);
+
+COMMIT;
@@ -0,0 +1,96 @@
+-- Convert the stock and crypto tables of an existing database into date range partitioned tables,
+-- with yearly partitions, (symbol, date) B-tree and date BRIN indexes. Requires 001 to be applied first
+
+BEGIN;
+
+ALTER TABLE stock RENAME TO stock_unpartitioned;
+ALTER TABLE stock_unpartitioned RENAME CONSTRAINT stock_symbol_date_unique TO stock_unpartitioned_symbol_date_unique;
+ALTER TABLE stock_unpartitioned RENAME CONSTRAINT stock_pkey TO stock_unpartitioned_pkey;
+ALTER TABLE crypto RENAME TO crypto_unpartitioned;
+ALTER TABLE crypto_unpartitioned RENAME CONSTRAINT crypto_symbol_date_unique TO crypto_unpartitioned_symbol_date_unique;
+ALTER TABLE crypto_unpartitioned RENAME CONSTRAINT crypto_pkey TO crypto_unpartitioned_pkey;
+
+CREATE TABLE stock (
+  id SERIAL,
+  asset_id INT,
+  symbol VARCHAR(255),
+  date DATE,
+  open DECIMAL(10, 2),
+  high DECIMAL(10, 2),
+  low DECIMAL(10, 2),
+  close DECIMAL(10, 2),
+  adj_close DECIMAL(10, 2),
+  volume INT,
+  unadjusted_volume INT,
+  change DECIMAL(10, 2),
+  change_percent DECIMAL(10, 2),
+  vwap FLOAT,
+  label VARCHAR(255),
+  change_over_time FLOAT,
+  as_of_date DATE,
+  FOREIGN KEY (asset_id) REFERENCES Asset (asset_id),
+  PRIMARY KEY (id, date),
+  CONSTRAINT stock_symbol_date_unique UNIQUE (symbol, date)
+) PARTITION BY RANGE (date);
+CREATE INDEX stock_date_brin ON stock USING BRIN (date);
+
+CREATE TABLE crypto (
+  id SERIAL,
+  asset_id INT,
+  symbol VARCHAR(255),
+  date DATE,
+  open DECIMAL(18, 8),
+  high DECIMAL(18, 8),
+  low DECIMAL(18, 8),
+  close DECIMAL(18, 8),
+  adj_close DECIMAL(18, 8),
+  volume BIGINT,
+  unadjusted_volume BIGINT,
+  change DECIMAL(18, 8),
+  change_percent DECIMAL(10, 2),
+  vwap DECIMAL(18, 8),
+  label VARCHAR(255),
+  change_over_time DECIMAL(18, 8),
+  as_of_date DATE,
+  FOREIGN KEY (asset_id) REFERENCES Asset (asset_id),
+  PRIMARY KEY (id, date),
+  CONSTRAINT crypto_symbol_date_unique UNIQUE (symbol, date)
+) PARTITION BY RANGE (date);
+CREATE INDEX crypto_date_brin ON crypto USING BRIN (date);
+
+-- yearly partitions covering the existing rows until next year, same naming as postgres_partition_registry.py
+DO $$
+DECLARE
+  price_table TEXT;
+  first_year INT;
+BEGIN
+  FOREACH price_table IN ARRAY ARRAY['stock', 'crypto'] LOOP
+    EXECUTE format('SELECT LEAST(COALESCE(EXTRACT(YEAR FROM MIN(date))::INT, %s), %s) FROM %I',
+                   CASE price_table WHEN 'stock' THEN 1980 ELSE 2010 END,
+                   CASE price_table WHEN 'stock' THEN 1980 ELSE 2010 END,
+                   price_table || '_unpartitioned')
+      INTO first_year;
+
+    FOR partition_year IN first_year..EXTRACT(YEAR FROM CURRENT_DATE)::INT + 1 LOOP
+      EXECUTE format(
+        'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+        price_table || '_y' || partition_year, price_table,
+        make_date(partition_year, 1, 1), make_date(partition_year + 1, 1, 1)
+      );
+    END LOOP;
+
+    EXECUTE format('CREATE TABLE %I PARTITION OF %I DEFAULT', price_table || '_default', price_table);
+  END LOOP;
+END $$;
+
+INSERT INTO stock SELECT * FROM stock_unpartitioned;
+INSERT INTO crypto SELECT * FROM crypto_unpartitioned;
+
+-- keep the id sequences going after the copied ids
+SELECT setval(pg_get_serial_sequence('stock', 'id'), COALESCE((SELECT MAX(id) FROM stock), 0) + 1, false);
+SELECT setval(pg_get_serial_sequence('crypto', 'id'), COALESCE((SELECT MAX(id) FROM crypto), 0) + 1, false);
+
+DROP TABLE stock_unpartitioned;
+DROP TABLE crypto_unpartitioned;
+
+COMMIT;
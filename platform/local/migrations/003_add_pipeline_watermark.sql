@@ -0,0 +1,12 @@
+-- Add the pipeline watermark table to an existing database
+
+-- Create Pipeline Watermark table
+-- last processed date per symbol and stage ('ingested' into MongoDB / 'standardized' into PostgreSQL), see watermark_manager.py
+CREATE TABLE IF NOT EXISTS pipeline_watermark (
+  asset_type VARCHAR(32),
+  symbol VARCHAR(255),
+  stage VARCHAR(32),
+  last_date DATE NOT NULL,
+  updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (asset_type, symbol, stage)
+);
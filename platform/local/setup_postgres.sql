@@ -1,4 +1,5 @@
 
+DROP TABLE IF EXISTS pipeline_watermark;
 DROP TABLE IF EXISTS stock;
 DROP TABLE IF EXISTS crypto;
 DROP TABLE IF EXISTS asset;
@@ -12,13 +13,15 @@ CREATE TABLE asset (
   exchange VARCHAR(255),
   exchange_short_name VARCHAR(255),
   type VARCHAR(255),
-  as_of_date DATE
+  as_of_date DATE,
+  CONSTRAINT asset_symbol_unique UNIQUE (symbol)
 );
 
 
 -- Create Stock table
+-- partitioned by date range, one partition per year (see postgres_partition_registry.py)
 CREATE TABLE stock (
-  id SERIAL PRIMARY KEY,
+  id SERIAL,
   asset_id INT,
   symbol VARCHAR(255),
   date DATE,
@@ -35,11 +38,32 @@ CREATE TABLE stock (
   label VARCHAR(255),
   change_over_time FLOAT,
   as_of_date DATE,
-  FOREIGN KEY (asset_id) REFERENCES Asset (asset_id)
-);
+  FOREIGN KEY (asset_id) REFERENCES Asset (asset_id),
+  -- primary / unique keys of a partitioned table must include the partition key
+  PRIMARY KEY (id, date),
+  -- B-tree (symbol, date), serves the per-symbol MIN / MAX date lookups and the upsert conflict check
+  CONSTRAINT stock_symbol_date_unique UNIQUE (symbol, date)
+) PARTITION BY RANGE (date);
+
+-- BRIN (date), small index for date range scans over all symbols
+CREATE INDEX stock_date_brin ON stock USING BRIN (date);
+
+-- yearly partitions until next year, PostgresManager.ensure_partitions adds the following years
+DO $$
+BEGIN
+  FOR partition_year IN 1980..EXTRACT(YEAR FROM CURRENT_DATE)::INT + 1 LOOP
+    EXECUTE format(
+      'CREATE TABLE IF NOT EXISTS stock_y%s PARTITION OF stock FOR VALUES FROM (%L) TO (%L)',
+      partition_year, make_date(partition_year, 1, 1), make_date(partition_year + 1, 1, 1)
+    );
+  END LOOP;
+END $$;
+CREATE TABLE stock_default PARTITION OF stock DEFAULT;
+
 -- Create Crypto table
+-- partitioned by date range, one partition per year (see postgres_partition_registry.py)
 CREATE TABLE crypto (
-  id SERIAL PRIMARY KEY,
+  id SERIAL,
   asset_id INT,
   symbol VARCHAR(255),
   date DATE,
@@ -56,7 +80,38 @@ CREATE TABLE crypto (
   label VARCHAR(255),
   change_over_time DECIMAL(18, 8),
   as_of_date DATE,
-  FOREIGN KEY (asset_id) REFERENCES Asset (asset_id)
+  FOREIGN KEY (asset_id) REFERENCES Asset (asset_id),
+  -- primary / unique keys of a partitioned table must include the partition key
+  PRIMARY KEY (id, date),
+  -- B-tree (symbol, date), serves the per-symbol MIN / MAX date lookups and the upsert conflict check
+  CONSTRAINT crypto_symbol_date_unique UNIQUE (symbol, date)
+) PARTITION BY RANGE (date);
+
+-- BRIN (date), small index for date range scans over all symbols
+CREATE INDEX crypto_date_brin ON crypto USING BRIN (date);
+
+-- yearly partitions until next year, PostgresManager.ensure_partitions adds the following years
+DO $$
+BEGIN
+  FOR partition_year IN 2010..EXTRACT(YEAR FROM CURRENT_DATE)::INT + 1 LOOP
+    EXECUTE format(
+      'CREATE TABLE IF NOT EXISTS crypto_y%s PARTITION OF crypto FOR VALUES FROM (%L) TO (%L)',
+      partition_year, make_date(partition_year, 1, 1), make_date(partition_year + 1, 1, 1)
+    );
+  END LOOP;
+END $$;
+CREATE TABLE crypto_default PARTITION OF crypto DEFAULT;
+
+
+-- Create Pipeline Watermark table
+-- last processed date per symbol and stage ('ingested' into MongoDB / 'standardized' into PostgreSQL), see watermark_manager.py
+CREATE TABLE pipeline_watermark (
+  asset_type VARCHAR(32),
+  symbol VARCHAR(255),
+  stage VARCHAR(32),
+  last_date DATE NOT NULL,
+  updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (asset_type, symbol, stage)
 );
 
 -- Insert dummy data into asset table
@@ -81,3 +136,4 @@ VALUES
 SELECT * FROM asset;
 SELECT * FROM stock;
 SELECT * FROM crypto;
+SELECT * FROM pipeline_watermark;
@@ -18,3 +18,4 @@ postgres
 #   1. create database "AssetFlowPlatform"
 #   2. Open Query Tools, run the following SQL Command:
 #   3. check in `setup_postgres.sql``
+#   4. for a database set up by an older version, run the scripts in `migrations/` in order instead
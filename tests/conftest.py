@@ -0,0 +1,5 @@
+import os
+
+# read by MongoDBManager at import time, normally set in .env
+os.environ.setdefault("MONGO_SERVER_URL", "mongodb://localhost:27017")
+os.environ.setdefault("MAX_POOL_SIZE", "10")
@@ -0,0 +1,49 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from aiohttp import web
+
+from InvestmentAsCode_AssetFlowPlatform.data_processing.loaders.api_loader import ApiLoader
+
+
+@pytest.fixture
+def price_server_url():
+    async def handle(request: web.Request) -> web.Response:
+        symbol = request.match_info["symbol"]
+        if symbol == "BAD":
+            return web.Response(text="{not json", content_type="application/json")
+        if symbol == "MISSING":
+            return web.Response(status=404)
+        return web.json_response({"symbol": symbol, "historical": [{"date": "2024-04-01", "close": 1.0}]})
+
+    loop = asyncio.new_event_loop()
+    app = web.Application()
+    app.router.add_get("/prices/{symbol}", handle)
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    loop.run_until_complete(site.start())
+    port = site._server.sockets[0].getsockname()[1]
+
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    yield f"http://127.0.0.1:{port}/prices/{{symbol}}"
+
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.run_until_complete(runner.cleanup())
+    loop.close()
+
+
+def test_fetch_data_for_symbols_keeps_other_symbols_when_one_fails(price_server_url):
+    api_loader = ApiLoader({"api_url": price_server_url, "api_key_name": "FMP_API_KEY", "parameters": {}})
+
+    results = api_loader.fetch_data_for_symbols(["AAPL", "BAD", "MISSING", "NVDA"], concurrency_limit=2)
+
+    assert results["AAPL"]["symbol"] == "AAPL"
+    assert results["NVDA"]["symbol"] == "NVDA"
+    assert isinstance(results["BAD"], json.JSONDecodeError)
+    assert isinstance(results["MISSING"], Exception)
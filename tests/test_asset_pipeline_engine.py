@@ -0,0 +1,168 @@
+from typing import Any, Dict, List, Optional, Tuple
+from unittest import mock
+
+import pytest
+
+from InvestmentAsCode_AssetFlowPlatform.data_processing.managers.mongo_manager import MongoDBManager
+from InvestmentAsCode_AssetFlowPlatform.data_processing.managers.watermark_manager import WatermarkManager
+from InvestmentAsCode_AssetFlowPlatform.jobs.asset_pipeline import asset_pipeline_engine
+from InvestmentAsCode_AssetFlowPlatform.jobs.asset_pipeline.asset_pipeline_config import PRICE_COLUMN_FIELDS
+from InvestmentAsCode_AssetFlowPlatform.jobs.asset_pipeline.asset_pipeline_engine import AssetPipelineEngine
+
+INGESTED = WatermarkManager.ingested_stage
+STANDARDIZED = WatermarkManager.standardized_stage
+
+
+def build_engine(asset_type: str = "stock") -> AssetPipelineEngine:
+    with mock.patch.object(MongoDBManager, "connect_mongo_db", return_value=mock.MagicMock()):
+        return AssetPipelineEngine.from_asset_type(asset_type)
+
+
+def test_get_ingested_max_dates_without_watermark_nor_price_database():
+    engine = build_engine()
+    cursor = mock.MagicMock()
+    cursor.fetchall.return_value = []
+
+    with mock.patch.object(MongoDBManager, "check_database_exists", return_value=False), \
+         mock.patch.object(engine.price_loader, "get_collections_min_max_dates") as get_collections_min_max_dates:
+        max_dates = engine.get_ingested_max_dates(cursor, ["AAPL", "NVDA"])
+
+    # nothing stored yet, every symbol gets its full history
+    assert max_dates == {}
+    get_collections_min_max_dates.assert_not_called()
+
+
+def test_get_ingested_max_dates_scans_symbols_without_watermark():
+    engine = build_engine()
+    cursor = mock.MagicMock()
+    cursor.fetchall.return_value = []
+
+    with mock.patch.object(MongoDBManager, "check_database_exists", return_value=True), \
+         mock.patch.object(engine.price_loader, "get_collections_min_max_dates",
+                           return_value={"AAPL": ("2000-01-03", "2024-04-01")}):
+        max_dates = engine.get_ingested_max_dates(cursor, ["AAPL", "NVDA"])
+
+    assert max_dates == {"AAPL": "2024-04-01"}
+
+
+def build_price(date: str) -> Dict[str, Any]:
+    return {**{field: 1.0 for field in PRICE_COLUMN_FIELDS.values()}, "date": date, "stock_symbol": "AAPL"}
+
+
+class FakeWatermarkStore:
+    """pipeline_watermark table whose updates are only visible once committed"""
+
+    def __init__(self, watermarks: Dict[Tuple[str, str], str]):
+        self.committed = dict(watermarks)
+        self.pending: Dict[Tuple[str, str], str] = {}
+
+    def get_watermarks(self, cursor, asset_type: str, symbols: List[str], stage: str) -> Dict[str, str]:
+        return {symbol: self.committed[(symbol, stage)] for symbol in symbols if (symbol, stage) in self.committed}
+
+    def update_watermark(self, cursor, asset_type: str, symbol: str, stage: str, last_date: str) -> None:
+        current_date = self.pending.get((symbol, stage), self.committed.get((symbol, stage)))
+        self.pending[(symbol, stage)] = max(filter(None, [current_date, last_date]))
+
+    def commit(self) -> None:
+        self.committed.update(self.pending)
+        self.pending.clear()
+
+    def rollback(self) -> None:
+        self.pending.clear()
+
+
+class FusedRun:
+    """run ingest_and_standardize_prices of AAPL with MongoDB, PostgreSQL and the price API mocked"""
+
+    def __init__(self, watermarks: Dict[Tuple[str, str], str], fetched_dates: List[str], mongo_dates: List[str] = ()):
+        self.engine = build_engine()
+        self.watermarks = FakeWatermarkStore(watermarks)
+        self.fetched_dates = fetched_dates
+        self.mongo_dates = list(mongo_dates)
+        self.postgres_dates: List[str] = []
+        self.fetch_data_for_symbols = mock.MagicMock(side_effect=lambda symbols, concurrency_limit, symbol_parameters: {
+            "AAPL": {"historical": [build_price(date) for date in self.fetched_dates]}
+        })
+        self.iter_new_mongo_prices = mock.MagicMock(side_effect=lambda symbol, max_date: iter(
+            [build_price(date) for date in self.mongo_dates if max_date is None or date > max_date]
+        ))
+        self.postgres_manager = mock.MagicMock()
+        self.postgres_manager.commit.side_effect = self.watermarks.commit
+        self.postgres_manager.conn.rollback.side_effect = self.watermarks.rollback
+        self.mongo_saver = mock.MagicMock()
+
+    def upsert_rows(self, cursor, table_name, columns, rows, conflict_columns) -> int:
+        rows = list(rows)
+        self.postgres_dates.extend(row[columns.index("date")] for row in rows)
+        return len(rows)
+
+    def run(self, standardized_max_date_in_postgres: Optional[str] = None) -> Dict[str, int]:
+        postgres_manager_class = mock.MagicMock()
+        postgres_manager_class.return_value.__enter__.return_value = self.postgres_manager
+        postgres_manager_class.upsert_rows.side_effect = self.upsert_rows
+
+        with mock.patch.object(asset_pipeline_engine, "PostgresManager", postgres_manager_class), \
+             mock.patch.object(asset_pipeline_engine, "MongoSaver", return_value=self.mongo_saver), \
+             mock.patch.object(WatermarkManager, "get_watermarks", side_effect=self.watermarks.get_watermarks), \
+             mock.patch.object(WatermarkManager, "update_watermark", side_effect=self.watermarks.update_watermark), \
+             mock.patch.object(self.engine.price_api_loader, "fetch_data_for_symbols", self.fetch_data_for_symbols), \
+             mock.patch.object(self.engine, "iter_new_mongo_prices", self.iter_new_mongo_prices), \
+             mock.patch.object(self.engine, "get_asset_infos", return_value={"AAPL": {"symbol": "AAPL", "date": "2024-04-01"}}), \
+             mock.patch.object(self.engine, "upsert_asset", return_value=1), \
+             mock.patch.object(self.engine, "get_standardized_max_date", return_value=standardized_max_date_in_postgres):
+            return self.engine.ingest_and_standardize_prices(["AAPL"])
+
+
+def test_fused_mode_standardizes_fetched_prices_when_watermarks_are_equal():
+    fused_run = FusedRun({("AAPL", INGESTED): "2024-04-01", ("AAPL", STANDARDIZED): "2024-04-01"},
+                         fetched_dates=["2024-04-03", "2024-04-02"])
+
+    assert fused_run.run() == {"AAPL": 2}
+
+    fused_run.iter_new_mongo_prices.assert_not_called()
+    assert fused_run.postgres_dates == ["2024-04-02", "2024-04-03"]
+    assert fused_run.watermarks.committed == {("AAPL", INGESTED): "2024-04-03", ("AAPL", STANDARDIZED): "2024-04-03"}
+    assert fused_run.fetch_data_for_symbols.call_args.args[2] == {"AAPL": {"from": "2024-04-02"}}
+
+
+@pytest.mark.parametrize("standardized_watermarks, standardized_max_date_in_postgres, expected_max_date", [
+    # a previous standardize failed after the ingest
+    ({("AAPL", STANDARDIZED): "2024-03-28"}, None, "2024-03-28"),
+    # no standardized watermark yet, the max date is read from PostgreSQL
+    ({}, "2024-03-28", "2024-03-28"),
+    # nothing in PostgreSQL yet while MongoDB has prices
+    ({}, None, None),
+])
+def test_fused_mode_catches_up_from_mongo_when_standardized_is_behind(standardized_watermarks,
+                                                                        standardized_max_date_in_postgres,
+                                                                        expected_max_date):
+    mongo_dates = ["2024-03-27", "2024-03-28", "2024-03-29", "2024-04-01", "2024-04-02"]
+    fused_run = FusedRun({("AAPL", INGESTED): "2024-04-01", **standardized_watermarks},
+                         fetched_dates=["2024-04-02"],
+                         mongo_dates=mongo_dates)
+
+    fused_run.run(standardized_max_date_in_postgres)
+
+    fused_run.iter_new_mongo_prices.assert_called_once_with("AAPL", expected_max_date)
+    assert fused_run.postgres_dates == [date for date in mongo_dates if expected_max_date is None or date > expected_max_date]
+    assert fused_run.watermarks.committed[("AAPL", INGESTED)] == "2024-04-02"
+    assert fused_run.watermarks.committed[("AAPL", STANDARDIZED)] == "2024-04-02"
+
+
+def test_fused_mode_rolls_back_both_watermarks_when_failing_after_mongo_write():
+    watermarks = {("AAPL", INGESTED): "2024-04-01", ("AAPL", STANDARDIZED): "2024-04-01"}
+    fused_run = FusedRun(watermarks, fetched_dates=["2024-04-02", "2024-04-03"])
+    fused_run.postgres_manager.commit.side_effect = ConnectionError("PostgreSQL went away")
+
+    with pytest.raises(ValueError, match="PostgreSQL went away"):
+        fused_run.run()
+
+    fused_run.mongo_saver.upsert_data.assert_called_once()
+    fused_run.postgres_manager.conn.rollback.assert_called_once()
+    assert fused_run.watermarks.committed == watermarks
+
+    # the next run fetches again from the previous ingested watermark
+    fused_run.postgres_manager.commit.side_effect = fused_run.watermarks.commit
+    assert fused_run.run() == {"AAPL": 2}
+    assert fused_run.fetch_data_for_symbols.call_args.args[2] == {"AAPL": {"from": "2024-04-02"}}
+    assert fused_run.watermarks.committed == {("AAPL", INGESTED): "2024-04-03", ("AAPL", STANDARDIZED): "2024-04-03"}
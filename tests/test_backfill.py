@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+from InvestmentAsCode_AssetFlowPlatform.jobs.asset_pipeline.backfill import (
+    build_work_units,
+    get_work_unit_key,
+    read_checkpoint,
+    write_checkpoint,
+)
+
+
+def test_build_work_units_splits_symbols_and_date_windows():
+    work_units = build_work_units("stock", ["AAPL", "NVDA"], "2024-01-01", "2024-01-10", window_days=4)
+
+    windows = [("2024-01-01", "2024-01-04"), ("2024-01-05", "2024-01-08"), ("2024-01-09", "2024-01-10")]
+    assert work_units == [
+        {"asset_type": "stock", "symbol": symbol, "from_date": from_date, "to_date": to_date}
+        for symbol in ["AAPL", "NVDA"]
+        for from_date, to_date in windows
+    ]
+
+
+def test_build_work_units_single_day():
+    assert build_work_units("crypto", ["BTCUSD"], "2024-02-29", "2024-02-29") == [
+        {"asset_type": "crypto", "symbol": "BTCUSD", "from_date": "2024-02-29", "to_date": "2024-02-29"}
+    ]
+
+
+@pytest.mark.parametrize("from_date, to_date, window_days", [
+    ("2024-01-10", "2024-01-01", 365),
+    ("2024-01-01", "2024-01-10", 0),
+])
+def test_build_work_units_rejects_invalid_ranges(from_date, to_date, window_days):
+    with pytest.raises(ValueError):
+        build_work_units("stock", ["AAPL"], from_date, to_date, window_days)
+
+
+def test_checkpoint_round_trip(tmp_path):
+    checkpoint_file = str(tmp_path / "backfill.checkpoint.jsonl")
+    work_units = build_work_units("stock", ["AAPL"], "2023-01-01", "2024-12-31", window_days=365)
+
+    assert read_checkpoint(checkpoint_file) == set()
+
+    write_checkpoint(checkpoint_file, work_units[0], 250)
+    write_checkpoint(checkpoint_file, work_units[1], 251)
+
+    assert read_checkpoint(checkpoint_file) == {get_work_unit_key(work_unit) for work_unit in work_units[:2]}
+    with open(checkpoint_file) as checkpoint:
+        assert json.loads(checkpoint.readline())["count"] == 250
+
+
+def test_read_checkpoint_skips_truncated_last_line(tmp_path):
+    checkpoint_file = tmp_path / "backfill.checkpoint.jsonl"
+    work_unit = build_work_units("stock", ["AAPL"], "2024-01-01", "2024-01-31")[0]
+    write_checkpoint(str(checkpoint_file), work_unit, 21)
+    # interrupted while appending the next unit
+    with open(checkpoint_file, "a") as checkpoint:
+        checkpoint.write('{"key": "stock:NVDA:2024-01')
+
+    assert read_checkpoint(str(checkpoint_file)) == {get_work_unit_key(work_unit)}
+
+
+def test_write_checkpoint_after_truncated_line(tmp_path):
+    checkpoint_file = tmp_path / "backfill.checkpoint.jsonl"
+    checkpoint_file.write_text('{"key": "stock:NVDA:2024-01')
+    work_unit = build_work_units("stock", ["AAPL"], "2024-01-01", "2024-01-31")[0]
+
+    write_checkpoint(str(checkpoint_file), work_unit, 21)
+
+    assert read_checkpoint(str(checkpoint_file)) == {get_work_unit_key(work_unit)}
@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from InvestmentAsCode_AssetFlowPlatform.utils.common_utils import iter_json_array_items, split_into_chunks
+
+
+def split_bytes(document: bytes, chunk_size: int):
+    return [document[index:index + chunk_size] for index in range(0, len(document), chunk_size)]
+
+
+@pytest.mark.parametrize("chunks", [
+    [b"[189.", b"84]"],
+    [b"[1e", b"3]"],
+    [b"[-", b"5, 2]"],
+    [b"[tr", b"ue, nu", b"ll]"],
+])
+def test_iter_json_array_items_scalars_split_across_chunks(chunks):
+    document = b"".join(chunks)
+    assert list(iter_json_array_items(chunks)) == json.loads(document)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+def test_iter_json_array_items_small_chunks(chunk_size):
+    records = [
+        {"symbol": "AAPL", "price": 189.84, "name": "Apple Inc. é"},
+        {"symbol": "BTCUSD", "price": 6.5e4, "volume": -1, "tags": ["a", "b"]},
+        1.5e-3, "x", True, None, [],
+    ]
+    document = json.dumps(records, indent=1).encode("utf-8")
+
+    assert list(iter_json_array_items(split_bytes(document, chunk_size))) == records
+
+
+def test_iter_json_array_items_empty_array():
+    assert list(iter_json_array_items([b" [ ", b" ] "])) == []
+
+
+@pytest.mark.parametrize("document", [
+    b"[1 2]",
+    b"[,1]",
+    b"[1,]",
+    b"[1,,2]",
+    b"[1x]",
+    b"[1, 2",
+    b"{\"a\": 1}",
+    b"[1] 2",
+])
+@pytest.mark.parametrize("chunk_size", [1, 100])
+def test_iter_json_array_items_rejects_malformed_arrays(document, chunk_size):
+    with pytest.raises(ValueError):
+        list(iter_json_array_items(split_bytes(document, chunk_size)))
+
+
+def test_split_into_chunks():
+    assert list(split_into_chunks(iter(range(7)), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(split_into_chunks([], 3)) == []
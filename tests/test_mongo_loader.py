@@ -0,0 +1,33 @@
+from unittest import mock
+
+from InvestmentAsCode_AssetFlowPlatform.data_processing.loaders.mongo_loader import MongoLoader
+from InvestmentAsCode_AssetFlowPlatform.data_processing.managers.mongo_manager import MongoDBManager
+
+
+def test_get_collections_min_max_dates_splits_union_pipelines():
+    client = mock.MagicMock()
+    with mock.patch.object(MongoDBManager, "connect_mongo_db", return_value=client):
+        loader = MongoLoader({"database_name": "ingestion-stock_price", "collection_name": None})
+
+    pipelines = []
+
+    def aggregate(pipeline):
+        pipelines.append(pipeline)
+        # one min / max document for every collection of the group
+        union_names = [stage["$unionWith"]["coll"] for stage in pipeline if "$unionWith" in stage]
+        return [
+            {"collection_name": name, "bound": bound, "date": "2000-01-03" if bound == "min" else "2024-04-01"}
+            for name in dict.fromkeys(union_names)
+            for bound in ("min", "max")
+        ]
+
+    client.__getitem__.return_value.__getitem__.return_value.aggregate.side_effect = aggregate
+    collection_names = [f"SYMBOL{index}" for index in range(450)]
+
+    with mock.patch.object(MongoDBManager, "check_database_exists", return_value=True), \
+         mock.patch.object(MongoDBManager, "get_timeseries_storage", return_value=None):
+        min_max_dates = loader.get_collections_min_max_dates(collection_names, "date")
+
+    assert len(pipelines) == 3
+    assert all(len(pipeline) < 1000 for pipeline in pipelines)
+    assert min_max_dates == {name: ("2000-01-03", "2024-04-01") for name in collection_names}
@@ -0,0 +1,19 @@
+from unittest import mock
+
+from pymongo.errors import OperationFailure
+
+from InvestmentAsCode_AssetFlowPlatform.data_processing.managers.mongo_manager import MongoDBManager
+
+
+def test_ensure_indexes_attempts_failed_creation_once(capsys):
+    client = mock.MagicMock()
+    collection = client["ingestion-stock_price"]["AAPL"]
+    collection.create_indexes.side_effect = OperationFailure("E11000 duplicate key error")
+
+    with mock.patch.object(MongoDBManager, "_indexed_collections", set()), \
+         mock.patch.object(MongoDBManager, "get_timeseries_storage", return_value=None):
+        MongoDBManager.ensure_indexes(client, "ingestion-stock_price", "AAPL")
+        MongoDBManager.ensure_indexes(client, "ingestion-stock_price", "AAPL")
+
+    assert collection.create_indexes.call_count == 1
+    assert "stock_symbol_date_unique" in capsys.readouterr().out
@@ -0,0 +1,57 @@
+import os
+from unittest import mock
+
+from InvestmentAsCode_AssetFlowPlatform.data_processing.loaders.api_loader import ApiLoader
+from InvestmentAsCode_AssetFlowPlatform.data_processing.loaders.response_cache import ResponseCache
+
+
+def store_evicted_entry(cache: ResponseCache, key: str) -> None:
+    cache.store(key, "https://example.com/list", b'[{"symbol": "OLD"}]', {})
+    entry = cache.get_entry(key)
+    assert entry is not None
+    # another process evicts the body right after get_entry
+    os.remove(cache.get_body_path(key))
+
+
+def test_evicted_body_is_a_cache_miss(tmp_path):
+    cache = ResponseCache({"cache_dir": str(tmp_path)})
+    store_evicted_entry(cache, "key")
+
+    assert cache.read_body("key") is None
+    assert cache.iter_body_chunks("key") is None
+
+
+def test_fetch_data_refetches_evicted_body(tmp_path):
+    api_loader = ApiLoader({
+        "api_url": "https://example.com/list",
+        "api_key_name": "FMP_API_KEY",
+        "parameters": {},
+        "cache": {"cache_dir": str(tmp_path)},
+    })
+    cache_key = api_loader.cache.build_key(api_loader.api_url, api_loader.parameters)
+    fresh_entry = {"stored_at": float("inf")}
+    response = mock.MagicMock(status_code=200, content=b'[{"symbol": "NEW"}]', headers={})
+    response.json.return_value = [{"symbol": "NEW"}]
+
+    with mock.patch.object(api_loader.cache, "get_entry", return_value=fresh_entry), \
+         mock.patch.object(api_loader, "_send_request", return_value=response) as send_request:
+        assert api_loader.fetch_data() == [{"symbol": "NEW"}]
+
+    send_request.assert_called_once_with(None)
+    assert api_loader.cache.read_body(cache_key) == b'[{"symbol": "NEW"}]'
+
+
+def test_fetch_data_in_batches_refetches_evicted_body(tmp_path):
+    api_loader = ApiLoader({
+        "api_url": "https://example.com/list",
+        "api_key_name": "FMP_API_KEY",
+        "parameters": {},
+        "cache": {"cache_dir": str(tmp_path)},
+    })
+    response = mock.MagicMock(status_code=200, headers={})
+    response.__enter__.return_value = response
+    response.iter_content.return_value = iter([b'[{"symbol": ', b'"NEW"}]'])
+
+    with mock.patch.object(api_loader.cache, "get_entry", return_value={"stored_at": float("inf")}), \
+         mock.patch.object(api_loader, "_send_request", return_value=response):
+        assert list(api_loader.fetch_data_in_batches(batch_size=10)) == [[{"symbol": "NEW"}]]
@@ -0,0 +1,133 @@
+import time
+from typing import Any, Iterable, List
+
+import pytest
+
+from InvestmentAsCode_AssetFlowPlatform.data_processing.loaders.loader import Loader
+from InvestmentAsCode_AssetFlowPlatform.data_processing.pipelines.stage_pipeline import StagePipeline
+from InvestmentAsCode_AssetFlowPlatform.data_processing.savers.saver import Saver
+
+
+class ListLoader(Loader):
+    def __init__(self, items: List[Any]):
+        super().__init__({})
+        self.items = items
+        self.produced_batches = 0
+
+    def fetch_data(self) -> List[Any]:
+        return self.items
+
+    def iter_batches(self, batch_size: int = 1000):
+        for batch in super().iter_batches(batch_size):
+            self.produced_batches += 1
+            yield batch
+
+    def load_data(self, data):
+        pass
+
+
+class ListSaver(Saver):
+    def __init__(self):
+        super().__init__({})
+        self.saved_items = []
+
+    def save_data(self, data: List[Any]) -> None:
+        self.saved_items.extend(data)
+
+
+def test_run_streams_batches_through_transforms():
+    saver = ListSaver()
+    pipeline = StagePipeline(ListLoader(list(range(10))),
+                             saver,
+                             [lambda batch: [item * 2 for item in batch], lambda batch: [item + 1 for item in batch]],
+                             batch_size=3,
+                             queue_size=1)
+    pipeline.run()
+
+    assert saver.saved_items == [item * 2 + 1 for item in range(10)]
+
+
+def test_run_returns_save_batches_result():
+    saver = ListSaver()
+    result = StagePipeline(ListLoader(list(range(5))), saver, batch_size=2,
+                           save_batches=lambda batches: sum(len(batch) for batch in batches)).run()
+
+    assert result == 5
+    assert saver.saved_items == []
+
+
+def test_failing_transform_stops_pipeline_and_raises():
+    def failing_transform(batch: List[Any]) -> List[Any]:
+        if 6 in batch:
+            raise ValueError("bad batch")
+        return batch
+
+    saved_batches = []
+
+    def save_batches(batches: Iterable[List[Any]]) -> None:
+        for batch in batches:
+            saved_batches.append(batch)
+
+    with pytest.raises(ValueError, match="bad batch"):
+        StagePipeline(ListLoader(list(range(10))), ListSaver(), [failing_transform], batch_size=3,
+                      save_batches=save_batches).run()
+
+    # the saver sees an error, never a complete stream missing the failed batch
+    assert [6, 7, 8] not in saved_batches
+    assert [9] not in saved_batches
+
+
+def test_failing_loader_raises():
+    class FailingLoader(ListLoader):
+        def fetch_data(self):
+            raise ConnectionError("API down")
+
+    with pytest.raises(ConnectionError, match="API down"):
+        StagePipeline(FailingLoader([]), ListSaver()).run()
+
+
+def test_failing_saver_stops_upstream_stages():
+    loader = ListLoader(list(range(10000)))
+
+    def save_batches(batches: Iterable[List[Any]]) -> None:
+        next(iter(batches))
+        raise RuntimeError("write failed")
+
+    with pytest.raises(RuntimeError, match="write failed"):
+        StagePipeline(loader, ListSaver(), batch_size=1, queue_size=1, save_batches=save_batches).run()
+
+    assert loader.produced_batches < 10
+
+
+def test_saver_exiting_early_doesnt_block():
+    loader = ListLoader(list(range(10000)))
+
+    def save_batches(batches: Iterable[List[Any]]) -> str:
+        next(iter(batches))
+        return "done"
+
+    assert StagePipeline(loader, ListSaver(), batch_size=1, queue_size=1, save_batches=save_batches).run() == "done"
+    assert loader.produced_batches < 10
+
+
+def test_backpressure_bounds_batches_in_flight():
+    loader = ListLoader(list(range(100)))
+    in_flight = []
+
+    def save_batches(batches: Iterable[List[Any]]) -> None:
+        for consumed_batches, _ in enumerate(batches, start=1):
+            # let the loader run ahead as far as the queues allow
+            time.sleep(0.01)
+            in_flight.append(loader.produced_batches - consumed_batches)
+
+    StagePipeline(loader, ListSaver(), [lambda batch: batch], batch_size=1, queue_size=2,
+                  save_batches=save_batches).run()
+
+    # 2 queues of 2 batches, plus one batch held by each of the load and transform stages
+    assert max(in_flight) <= 6
+
+
+@pytest.mark.parametrize("batch_size, queue_size", [(0, 1), (1, -1)])
+def test_invalid_sizes_raise(batch_size, queue_size):
+    with pytest.raises(ValueError):
+        StagePipeline(ListLoader([]), ListSaver(), batch_size=batch_size, queue_size=queue_size)
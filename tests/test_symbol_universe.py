@@ -0,0 +1,34 @@
+from unittest import mock
+
+import pytest
+
+from InvestmentAsCode_AssetFlowPlatform.jobs.asset_pipeline import symbol_universe
+from InvestmentAsCode_AssetFlowPlatform.jobs.asset_pipeline.symbol_universe import build_shard_kwargs, split_into_shards
+
+
+def test_split_into_shards_round_robin():
+    assert split_into_shards(["A", "B", "C", "D", "E"], 2) == [["A", "C", "E"], ["B", "D"]]
+
+
+def test_split_into_shards_leaves_out_empty_shards():
+    assert split_into_shards(["A", "B"], 4) == [["A"], ["B"]]
+    assert split_into_shards([], 3) == []
+
+
+def test_split_into_shards_keeps_every_symbol_once():
+    symbols = [f"SYMBOL{index}" for index in range(101)]
+    shards = split_into_shards(symbols, 7)
+
+    assert sorted(symbol for shard in shards for symbol in shard) == sorted(symbols)
+    assert max(map(len, shards)) - min(map(len, shards)) <= 1
+
+
+@pytest.mark.parametrize("shard_count", [0, -1])
+def test_split_into_shards_rejects_invalid_shard_count(shard_count):
+    with pytest.raises(ValueError):
+        split_into_shards(["A"], shard_count)
+
+
+def test_build_shard_kwargs():
+    with mock.patch.object(symbol_universe, "get_symbol_universe", return_value=["AAPL", "NVDA", "TSLA"]):
+        assert build_shard_kwargs("stock", 2) == [{"stock_symbols": ["AAPL", "TSLA"]}, {"stock_symbols": ["NVDA"]}]